@@ -0,0 +1,87 @@
+# arena_bench.py - 演算法競技場執行器 (Algo Arena Benchmark Executor)
+import os
+import time
+import atexit
+import threading
+import statistics
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ARENA_WORKERS = int(os.environ.get("CITYOS_ARENA_WORKERS", "2"))
+ARENA_MAX_PENDING = int(os.environ.get("CITYOS_ARENA_MAX_PENDING", "8"))
+# 例如 "2,3"：把 benchmark 子行程綁在指定 CPU，避免和 Streamlit 伺服器搶核心
+ARENA_CPUS = os.environ.get("CITYOS_ARENA_CPUS", "")
+INPUT_SIZE = 5000
+BUBBLE_SIZE = 300
+WARMUP = 2
+REPEAT = 7
+
+
+# --- 武器 (真正的演算法實作) ---
+def bubble_sort(d):
+    n = len(d)
+    for i in range(n):
+        swapped = False
+        for j in range(n - 1 - i):
+            if d[j] > d[j + 1]:
+                d[j], d[j + 1] = d[j + 1], d[j]
+                swapped = True
+        if not swapped: break
+    return d
+
+WEAPONS = {
+    # key: (說明, 基礎傷害, 每次量測前的輸入準備, 被量測的函式)
+    "bubble": ("O(n^2) 氣泡排序", 10, lambda: _LIST[:BUBBLE_SIZE], bubble_sort),
+    "timsort": ("O(n log n) Timsort", 50, lambda: list(_LIST), lambda d: d.sort()),
+    "numpy": ("NumPy introsort", 80, lambda: _ARRAY, np.sort),
+}
+
+_LIST = None
+_ARRAY = None
+
+def _init_worker(data, cpus):
+    global _LIST, _ARRAY
+    _ARRAY = data
+    _LIST = data.tolist()
+    if cpus and hasattr(os, "sched_setaffinity"): os.sched_setaffinity(0, cpus)
+
+def _run_benchmark(weapon, warmup, repeat):
+    _, _, prepare, fn = WEAPONS[weapon]
+    times = []
+    for i in range(warmup + repeat):
+        d = prepare()  # 每次都從同一份打亂的輸入複製，排序過的資料不會讓後面的量測變快
+        t0 = time.perf_counter()
+        fn(d)
+        if i >= warmup: times.append(time.perf_counter() - t0)
+    return {"weapon": weapon, "min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+class ArenaExecutor:
+    """在獨立子行程池中執行 benchmark，Streamlit 執行緒只拿到 Future。
+
+    輸入資料在母行程產生一次，於子行程初始化時傳入並轉好 list，所有量測共用同一份資料；
+    同時排隊的工作數有上限，滿了 submit() 回傳 None。
+    """
+
+    def __init__(self, workers=ARENA_WORKERS, max_pending=ARENA_MAX_PENDING, cpus=ARENA_CPUS, seed=None):
+        data = np.random.default_rng(seed).permutation(INPUT_SIZE).astype(np.int64)
+        cpu_set = {int(c) for c in cpus.split(",") if c.strip()} if isinstance(cpus, str) else set(cpus or ())
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(data, cpu_set))
+        self._slots = threading.BoundedSemaphore(max_pending)
+        atexit.register(self.shutdown)
+
+    def submit(self, weapon, warmup=WARMUP, repeat=REPEAT):
+        if not self._slots.acquire(blocking=False): return None
+        try:
+            fut = self._pool.submit(_run_benchmark, weapon, warmup, repeat)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
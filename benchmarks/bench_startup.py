@@ -0,0 +1,112 @@
+# benchmarks/bench_startup.py - 冷啟動基準 (Cold-start benchmark)
+"""量測各頁面模組的 import 時間與 AppTest 首次渲染時間，並和 startup_baseline.json 比較。
+
+    python benchmarks/bench_startup.py            # 與基準比較，退步時 exit 1
+    python benchmarks/bench_startup.py --update   # 重新寫入基準
+
+每個量測都在全新的子行程中執行 (取 --repeat 次的最小值)，才是真正的冷啟動。
+除了時間，也檢查登入頁不會載入 sympy/pandas/numpy、儀表板不會載入 sympy。
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+HEAVY = ["sympy", "pandas", "numpy", "plotly"]  # plotly 會被 streamlit 本身載入，只列出供參考
+TOLERANCE = 1.5     # 超過基準 x1.5 ...
+SLACK = 0.05        # ... 再加 50 ms 才算退步，避免雜訊誤判
+# 頁面 -> 不應該被載入的套件
+FORBIDDEN = {"login": ["sympy", "pandas", "numpy"], "dashboard": ["sympy"]}
+
+_IMPORT_PROBE = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+import streamlit
+t0 = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - t0, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_RENDER_PROBE = """
+import os, sys, time, json
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+out = {{}}
+def timed(name, step):
+    t0 = time.perf_counter()
+    at = step()
+    assert not at.exception, at.exception
+    out[name] = {{"seconds": time.perf_counter() - t0, "heavy": [m for m in {heavy!r} if m in sys.modules]}}
+    return at
+at = AppTest.from_file(os.path.join({root!r}, "app.py"), default_timeout=120)
+timed("login", at.run)
+timed("dashboard", lambda: at.button[0].click().run())
+timed("calculator", lambda: at.sidebar.radio[0].set_value(at.sidebar.radio[0].options[-1]).run())
+print(json.dumps(out))
+"""
+
+
+def _probe(code, env=None):
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, env=env, timeout=600)
+    if res.returncode != 0: raise RuntimeError(res.stderr[-2000:])
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def measure(repeat=3):
+    from views import PAGES  # 只讀頁面清單 (views/__init__ 不 import 任何頁面)
+    results = {}
+    modules = ["services"] + [f"views.{m}" for m in PAGES.values()]
+    for module in modules:
+        runs = [_probe(_IMPORT_PROBE.format(root=ROOT, module=module, heavy=HEAVY)) for _ in range(repeat)]
+        results[f"import:{module}"] = min(runs, key=lambda r: r["seconds"])
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as d:
+            env = dict(os.environ, CITYOS_DB_FILE=os.path.join(d, "bench.db"))
+            for name, r in _probe(_RENDER_PROBE.format(root=ROOT, heavy=HEAVY), env).items():
+                key = f"render:{name}"
+                if key not in results or r["seconds"] < results[key]["seconds"]: results[key] = r
+    return results
+
+
+def check(results, baseline):
+    problems = []
+    for name, banned in FORBIDDEN.items():
+        loaded = sorted(set(banned) & set(results[f"render:{name}"]["heavy"]))
+        if loaded: problems.append(f"render:{name} 載入了 {', '.join(loaded)}")
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is not None and r["seconds"] > base * TOLERANCE + SLACK:
+            problems.append(f"{key}: {r['seconds'] * 1000:.0f} ms > 基準 {base * 1000:.0f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="把這次結果寫成新的基準")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    results = measure(args.repeat)
+    for key, r in results.items():
+        print(f"{key:<28} {r['seconds'] * 1000:8.1f} ms   {' '.join(r['heavy'])}")
+
+    if args.update:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump({k: round(r["seconds"], 4) for k, r in results.items()}, f, indent=2)
+        print(f"基準已寫入 {BASELINE}")
+        return 0
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f: baseline = json.load(f)
+    problems = check(results, baseline)
+    for p in problems: print("REGRESSION", p)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+# benchmarks/load_test.py - 多使用者壓力測試 (Headless multi-session load test)
+"""以 Streamlit AppTest 無頭驅動真正的 app.py，模擬多個行程 x 多條執行緒的同時使用者。
+
+    python benchmarks/load_test.py --procs 4 --users 25 --iterations 2       # 100 位同時使用者
+    python benchmarks/load_test.py --out benchmarks/load_baseline.json        # 產生基準
+    python benchmarks/load_test.py --compare benchmarks/load_baseline.json    # 與基準比較，退步時 exit 1
+
+每個行程相當於一個 Streamlit 伺服器 (cache_resource 服務各一份)，每條執行緒是一個 session：
+登入 -> 儀表板 -> 演算法競技場出招 -> 訊號解碼 -> 記憶體購買，全部打在同一個暫存 DB。
+AppTest 每次 run 都會替換行程全域的 Runtime，同一行程內的 rerun 因此以鎖排隊執行 (背景服務仍並行)，
+真正同時的寫入來自多個行程；回報的延遲只計 rerun 本身，不含排隊時間。
+結束後比對每位使用者的 money/EXP 與「客戶端觀察到的成功操作 + 任務獎勵」，找出遺失的更新。
+"""
+import os
+import sys
+import json
+import time
+import queue
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+import multiprocessing as mp
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+START_MONEY = 100_000
+PASSWORD = "x"
+# 與頁面相同的獎勵/價格；變更頁面時要一起改
+DECODE_MONEY, DECODE_EXP = 300, 50
+WIN_MONEY, WIN_EXP = 500, 100
+TOLERANCE = 1.5     # p95 超過基準 x1.5 (再加 SLACK) 算退步
+SLACK = 0.05
+
+
+def _percentiles(values):
+    data = sorted(values)
+    if not data: return {"n": 0}
+    pick = lambda p: data[min(len(data) - 1, int(len(data) * p / 100))]
+    return {"n": len(data), "p50": pick(50), "p95": pick(95), "p99": pick(99), "max": data[-1]}
+
+
+# --- 子行程：一組模擬使用者 ---
+_run_lock = threading.Lock()
+_local = threading.local()
+
+def _serialize_apptest():
+    from streamlit.testing.v1 import AppTest
+    original = AppTest._run
+
+    def run(self, *args, **kwargs):
+        with _run_lock:
+            t0 = time.perf_counter()
+            try: return original(self, *args, **kwargs)
+            finally: _local.busy = getattr(_local, "busy", 0.0) + time.perf_counter() - t0
+    AppTest._run = run
+
+
+class Session:
+    """單一模擬使用者：自己的 AppTest (= 自己的 session_state)。"""
+
+    def __init__(self, uid, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.uid = uid
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.decoded = 0
+        self.wins = 0
+
+    def step(self, action, fn):
+        _local.busy = 0.0
+        try:
+            fn()
+        except Exception as e:  # AppTest 逾時或 app 以外的錯誤
+            self.errors[_classify(str(e))] += 1
+            return False
+        self.latency[action].append(_local.busy)
+        for exc in self.at.exception: self.errors[_classify(exc.message)] += 1
+        return not self.at.exception
+
+    def click(self, text):
+        for b in self.at.button:
+            if text in (b.label or ""): return b.click().run()
+        raise LookupError(f"找不到按鈕 {text}")
+
+    def goto(self, module):
+        from views import PAGES
+        label = next(k for k, v in PAGES.items() if v == module)
+        self.at.radio(key="nav").set_value(label).run()
+
+    def login(self):
+        self.at.run()
+        self.at.text_input[0].set_value(self.uid)
+        self.at.text_input[1].set_value(PASSWORD)
+        self.click("建立連線")
+
+    def decode(self):
+        self.goto("signals")
+        target = self.at.session_state["signal_target"]
+        self.at.text_input[0].set_value(target)
+        self.click("傳送")
+        # 成功時頁面會 st.rerun() 換下一題，成功訊息看不到；沒有 CRC 錯誤且沒有例外就是成功
+        if not self.at.exception and not any("驗證失敗" in e.value for e in self.at.error): self.decoded += 1
+
+    def attack(self):
+        self.goto("arena")
+        hp = self.at.session_state["enemy_hp"] if "enemy_hp" in self.at.session_state else 100
+        self.click("編譯並執行")
+        if "arena_job" not in self.at.session_state: return   # 佇列已滿
+        self.at.session_state["arena_job"].result(timeout=self.at.default_timeout)
+        self.at.run()  # 結果 fragment 結算傷害
+        last = self.at.session_state["arena_last"] if "arena_last" in self.at.session_state else {}
+        if "dmg" in last and hp - last["dmg"] <= 0: self.wins += 1
+
+    def buy(self):
+        self.goto("memory")
+        self.click(random.choice(["配置陣列", "配置節點"]))
+
+    def run(self, iterations):
+        if not self.step("login", self.login): return
+        for _ in range(iterations):
+            self.step("dashboard", lambda: self.goto("dashboard"))
+            self.step("dashboard_tick", self.at.run)
+            self.step("arena", self.attack)
+            self.step("signals", self.decode)
+            self.step("memory", self.buy)
+
+
+def _classify(message):
+    msg = message.lower()
+    if "locked" in msg or "busy" in msg: return "db_locked"
+    if "timed out" in msg or "timeout" in msg: return "timeout"
+    return message.splitlines()[0][:120] if message else "unknown"
+
+
+def _worker(uids, iterations, timeout, out):
+    sys.path.insert(0, ROOT)
+    _serialize_apptest()
+    sessions = [Session(uid, timeout) for uid in uids]
+    threads = [threading.Thread(target=s.run, args=(iterations,), name=s.uid) for s in sessions]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    out.put({"latency": {s.uid: dict(s.latency) for s in sessions},
+             "errors": {s.uid: dict(s.errors) for s in sessions},
+             "outcomes": {s.uid: (s.decoded, s.wins) for s in sessions}})
+    # 結束前讓背景服務 (任務獎勵、記憶體堆疊) 把資料寫回 DB，才能比對遺失更新
+    from services import get_missions, get_memory, get_arena
+    get_missions().stop()
+    get_memory().stop()
+    get_arena().shutdown(wait=True)
+
+
+# --- 母行程 ---
+def seed(db_path, users):
+    import database
+    database.configure(db_path)
+    database.init_db()
+    for uid in users:
+        database.save_user(uid, {"name": uid, "password": PASSWORD, "level": 1, "exp": 0, "money": START_MONEY, "stocks": {}})
+    database.close_db()
+
+
+def audit(db_path, outcomes):
+    """用客戶端觀察到的 (解碼成功數, 擊敗 Bug 數) 與 DB 內的購買/任務紀錄，反推每位使用者應有的 money/EXP。"""
+    from missions import load_missions
+    from memory_stack import BLOCK_TYPES
+    rewards = {m["id"]: m["reward"] for m in load_missions()}
+    conn = sqlite3.connect(db_path)
+    lost = []
+    for uid, (n, wins) in outcomes.items():
+        money, exp = conn.execute("SELECT money, exp FROM users WHERE id=?", (uid,)).fetchone()
+        spent = sum(BLOCK_TYPES[k][0] * c for k, c in conn.execute("SELECT kind, count FROM memory_counts WHERE user_id=?", (uid,)))
+        earned = sum(rewards[m] for (m,) in conn.execute("SELECT mission_id FROM mission_claims WHERE user_id=?", (uid,)))
+        want_money = START_MONEY + DECODE_MONEY * n + WIN_MONEY * wins + earned - spent
+        want_exp = DECODE_EXP * n + WIN_EXP * wins
+        if (money, exp) != (want_money, want_exp):
+            lost.append({"uid": uid, "money": money, "expected_money": want_money, "exp": exp, "expected_exp": want_exp})
+    conn.close()
+    return lost
+
+
+def run(procs, users, iterations, timeout=120, keep_db=False):
+    tmp = tempfile.mkdtemp(prefix="cityos-load-")
+    db_path = os.path.join(tmp, "cityos_core.db")
+    uids = [f"load_{p:02d}_{u:03d}" for p in range(procs) for u in range(users)]
+    seed(db_path, uids)
+
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    env_backup = os.environ.get("CITYOS_DB_FILE")
+    os.environ["CITYOS_DB_FILE"] = db_path      # spawn 的子行程繼承環境變數
+    t0 = time.perf_counter()
+    workers = [ctx.Process(target=_worker, args=(uids[p * users:(p + 1) * users], iterations, timeout, out))
+               for p in range(procs)]
+    try:
+        for w in workers: w.start()
+        parts = []
+        while len(parts) < len(workers):
+            try: parts.append(out.get(timeout=5))
+            except queue.Empty:
+                if not any(w.is_alive() for w in workers) and out.empty(): raise RuntimeError("壓測子行程異常結束")
+        for w in workers: w.join()
+    finally:
+        if env_backup is None: os.environ.pop("CITYOS_DB_FILE", None)
+        else: os.environ["CITYOS_DB_FILE"] = env_backup
+    wall = time.perf_counter() - t0
+
+    latency, errors, outcomes = defaultdict(list), defaultdict(int), {}
+    for part in parts:
+        for per_action in part["latency"].values():
+            for action, values in per_action.items(): latency[action].extend(values)
+        for per_kind in part["errors"].values():
+            for kind, n in per_kind.items(): errors[kind] += n
+        outcomes.update(part["outcomes"])
+    all_reruns = [v for values in latency.values() for v in values]
+    lost = audit(db_path, outcomes)
+    if not keep_db: shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "config": {"procs": procs, "users": users, "iterations": iterations},
+        "wall_seconds": wall,
+        "reruns": len(all_reruns),
+        "throughput": len(all_reruns) / wall if wall else 0.0,
+        "latency": {"all": _percentiles(all_reruns), **{a: _percentiles(v) for a, v in sorted(latency.items())}},
+        "errors": dict(errors),
+        "db_lock_errors": errors.get("db_locked", 0),
+        "lost_updates": len(lost),
+        "lost_detail": lost[:20],
+        **({"db": db_path} if keep_db else {}),
+    }
+
+
+def compare(result, baseline):
+    problems = []
+    if result["config"] != baseline.get("config"):
+        problems.append(f"設定不同，無法比較：{result['config']} vs 基準 {baseline.get('config')}")
+        return problems
+    if result["lost_updates"] > baseline.get("lost_updates", 0): problems.append(f"lost updates {result['lost_updates']}")
+    if result["db_lock_errors"] > baseline.get("db_lock_errors", 0): problems.append(f"db lock errors {result['db_lock_errors']}")
+    for action, stats in result["latency"].items():
+        base = baseline.get("latency", {}).get(action, {}).get("p95")
+        if base is not None and stats.get("p95", 0) > base * TOLERANCE + SLACK:
+            problems.append(f"{action} p95 {stats['p95'] * 1000:.0f} ms > 基準 {base * 1000:.0f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=int, default=4, help="模擬的伺服器行程數")
+    parser.add_argument("--users", type=int, default=25, help="每個行程的同時使用者數")
+    parser.add_argument("--iterations", type=int, default=2, help="每位使用者重複幾輪操作")
+    parser.add_argument("--timeout", type=float, default=120, help="單次 rerun 的 AppTest 逾時 (秒)")
+    parser.add_argument("--keep-db", action="store_true", help="保留暫存 DB 以便事後檢查")
+    parser.add_argument("--out", help="把結果寫成 JSON (例如作為新基準)")
+    parser.add_argument("--compare", help="與基準 JSON 比較，退步時 exit 1")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    result = run(args.procs, args.users, args.iterations, args.timeout, args.keep_db)
+    print(f"{args.procs} procs x {args.users} users x {args.iterations} rounds: "
+          f"{result['reruns']} reruns in {result['wall_seconds']:.1f} s ({result['throughput']:.1f}/s)")
+    for action, s in result["latency"].items():
+        if s["n"]: print(f"  {action:<16} n={s['n']:<6} p50 {s['p50'] * 1000:7.1f} ms  p95 {s['p95'] * 1000:7.1f} ms  p99 {s['p99'] * 1000:7.1f} ms")
+    print(f"  errors: {result['errors'] or 'none'} | lost updates: {result['lost_updates']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: problems = compare(result, json.load(f))
+        for p in problems: print("REGRESSION", p)
+        return 1 if problems else 0
+    return 1 if result["lost_updates"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# charts.py - 共用圖表層 (Shared Plotting Layer)
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+import telemetry
+
+NEON = "#00ff41"
+TEMPLATE = "cityos"
+TARGET_WIDTH = 800      # 目標像素寬度：每個像素最多一個點就足夠
+GL_THRESHOLD = 1000     # 超過這個點數改用 WebGL (Scattergl)
+
+
+@lru_cache(maxsize=1)
+def template():
+    """Cyberpunk 版面只建立一次並註冊為 plotly template，各頁面不用再複製 layout 參數。"""
+    pio.templates[TEMPLATE] = go.layout.Template(layout=go.Layout(
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(color=NEON),
+        colorway=[NEON, "#ff0055", "#00ccff", "#ffcc00", "#cc66ff"],
+        xaxis=dict(gridcolor="#1a2a1a", zerolinecolor="#224422"),
+        yaxis=dict(gridcolor="#1a2a1a", zerolinecolor="#224422"),
+    ))
+    return TEMPLATE
+
+
+def figure(*traces, **layout):
+    fig = go.Figure(data=list(traces))
+    fig.update_layout(template=template(), **layout)
+    return fig
+
+
+def lttb(x, y, n):
+    """Largest-Triangle-Three-Buckets 降採樣：保留視覺形狀 (峰值、轉折) 的前提下只留 n 點。"""
+    size = len(y)
+    if n >= size or n < 3: return np.arange(size)
+    xs = np.asarray(x, dtype=float) if np.issubdtype(np.asarray(x).dtype, np.number) else np.arange(size, dtype=float)
+    ys = np.asarray(y, dtype=float)
+    edges = np.linspace(1, size - 1, n - 1).astype(int)  # 中間 n-2 個 bucket 的邊界
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < n - 1 else size)
+        cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        bx, by = xs[lo:hi], ys[lo:hi]
+        area = np.abs((xs[a] - cx) * (by - ys[a]) - (xs[a] - bx) * (cy - ys[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def line(x=None, y=None, max_points=TARGET_WIDTH, **kw):
+    """折線 trace：點數超過 max_points 先做 LTTB；實際送出的點數超過 GL_THRESHOLD 才用 Scattergl。
+
+    預設 max_points (TARGET_WIDTH) 小於 GL_THRESHOLD，所以一般圖表都是 SVG；只有呼叫端
+    明確要求保留更多點 (max_points=None 或大於門檻) 時才會用到 WebGL (瀏覽器的 GL context 數有限)。
+    """
+    y = np.asarray(y)
+    x = np.arange(len(y)) if x is None else np.asarray(x)
+    if max_points and len(y) > max_points:
+        # 含 NaN/inf (例如 log(x) 在負半軸) 時 LTTB 面積無意義，改用等距抽樣保留斷點
+        if np.issubdtype(y.dtype, np.number) and np.isfinite(y).all(): idx = lttb(x, y, max_points)
+        else: idx = np.linspace(0, len(y) - 1, max_points).astype(int)
+        x, y = x[idx], y[idx]
+    kw.setdefault("mode", "lines")
+    trace = go.Scattergl if len(y) > GL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, **kw)
+
+
+def show(fig, name, container=st):
+    """name 為 `頁面.圖表` (例如 dashboard.price)，效能面板依此分別統計每張圖的大小。"""
+    telemetry.chart_size(fig, name)
+    container.plotly_chart(fig, use_container_width=True)
@@ -2,71 +2,557 @@
 import sqlite3
 import json
 import time
+import os
+import queue
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
 
-DB_FILE = "cityos_core.db"
+import telemetry
+
+DB_FILE = os.environ.get("CITYOS_DB_FILE", "cityos_core.db")
+
+# --- 連線參數 (Connection Tuning) ---
+# WAL 模式下 NORMAL 只在 checkpoint 時 fsync，斷電最多遺失最後幾筆交易，不會損毀資料庫
+DB_SYNCHRONOUS = os.environ.get("CITYOS_DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("CITYOS_DB_BUSY_TIMEOUT_MS", "5000"))
+DB_STATEMENT_CACHE = int(os.environ.get("CITYOS_DB_STATEMENT_CACHE", "256"))
+DB_POOL_SIZE = int(os.environ.get("CITYOS_DB_POOL_SIZE", "8"))
+
+# --- 日誌寫入 (Log Writer) ---
+LOG_BATCH_SIZE = int(os.environ.get("CITYOS_LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("CITYOS_LOG_FLUSH_INTERVAL", "0.5"))
+LOG_RETENTION_DAYS = float(os.environ.get("CITYOS_LOG_RETENTION_DAYS", "30"))
+LOG_TAIL_SIZE = 100
+
+
+class ConnectionPool:
+    """長連線池 (Long-lived connection pool).
+
+    Streamlit 每次 rerun 都可能換一條執行緒，所以連線不綁執行緒，而是借出/歸還；
+    同一執行緒內巢狀借用會拿到同一條連線，讓 transaction() 內可以呼叫其他查詢函式。
+    每條連線保留 sqlite3 內建的 prepared statement LRU 快取 (cached_statements)。
+    """
+
+    def __init__(self, path, synchronous=DB_SYNCHRONOUS, busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                 cached_statements=DB_STATEMENT_CACHE, pool_size=DB_POOL_SIZE):
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with self._lock:
+            self._all.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._all.discard(conn)
+        conn.close()
+
+    def _acquire(self):
+        if self._closed: raise sqlite3.ProgrammingError("connection pool is closed")
+        try: return self._idle.get_nowait()
+        except queue.Empty: return self._open()
+
+    def _release(self, conn):
+        if conn.in_transaction: conn.rollback()
+        if self._closed: return self._discard(conn)
+        try: self._idle.put_nowait(conn)
+        except queue.Full: self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE：一開始就取得寫鎖，避免兩個讀轉寫的交易互相卡死 (database is locked)
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try: self._discard(self._idle.get_nowait())
+            except queue.Empty: break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None: _pool = ConnectionPool(DB_FILE)
+    return _pool
+
+def configure(path=None, **options):
+    """切換資料庫檔案或連線參數 (例如壓力測試用暫存 DB)。"""
+    global _pool, DB_FILE
+    with _pool_lock:
+        if _pool is not None: _pool.close()
+        if path is not None: DB_FILE = path
+        _pool = ConnectionPool(DB_FILE, **options)
+    return _pool
+
+def connection():
+    return get_pool().connection()
+
+def transaction():
+    return get_pool().transaction()
+
+@atexit.register
+def close_db():
+    # 先把尚未寫入的日誌 flush 完，再關閉連線
+    if _log_writer is not None: _log_writer.close()
+    if _pool is not None: _pool.close()
+
+
+# --- 資料表結構與遷移 (Schema & Migrations) ---
+# 以 PRAGMA user_version 記錄版本；舊的 cityos_core.db (users.data JSON) 會在 init_db() 時自動轉換
+def _migrate_base(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, data TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS system_state (key TEXT PRIMARY KEY, value TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS logs (timestamp REAL, message TEXT)''')
+
+def _migrate_normalize_users(conn):
+    conn.execute("ALTER TABLE users RENAME TO users_json")
+    conn.execute('''CREATE TABLE users (
+        id TEXT PRIMARY KEY, name TEXT NOT NULL, password TEXT NOT NULL,
+        level INTEGER NOT NULL DEFAULT 1, exp INTEGER NOT NULL DEFAULT 0, money INTEGER NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE holdings (
+        user_id TEXT NOT NULL REFERENCES users(id), symbol TEXT NOT NULL, qty INTEGER NOT NULL,
+        PRIMARY KEY (user_id, symbol)) WITHOUT ROWID''')
+    for uid, data in conn.execute("SELECT id, data FROM users_json").fetchall():
+        _write_user(conn, uid, json.loads(data))
+    conn.execute("DROP TABLE users_json")
+
+def _migrate_leases(conn):
+    conn.execute('''CREATE TABLE leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)''')
+
+def _migrate_ticks(conn):
+    # WITHOUT ROWID：主鍵 (symbol, ts) 即為叢集索引，範圍查詢不需回表 (covering)
+    conn.execute('''CREATE TABLE ticks (symbol TEXT NOT NULL, ts REAL NOT NULL, price REAL NOT NULL,
+        PRIMARY KEY (symbol, ts)) WITHOUT ROWID''')
+
+def _migrate_log_index(conn):
+    conn.execute("CREATE INDEX idx_logs_timestamp ON logs(timestamp)")
+
+def _migrate_missions(conn):
+    conn.execute('''CREATE TABLE event_counts (user_id TEXT NOT NULL, event TEXT NOT NULL, count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, event)) WITHOUT ROWID''')
+    conn.execute('''CREATE TABLE mission_claims (user_id TEXT NOT NULL, mission_id TEXT NOT NULL, claimed_at REAL NOT NULL,
+        PRIMARY KEY (user_id, mission_id)) WITHOUT ROWID''')
+
+def _migrate_memory(conn):
+    conn.execute("CREATE TABLE memory_stacks (user_id TEXT PRIMARY KEY, yield INTEGER NOT NULL, size INTEGER NOT NULL)")
+    conn.execute('''CREATE TABLE memory_counts (user_id TEXT NOT NULL, kind TEXT NOT NULL, count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, kind)) WITHOUT ROWID''')
+    # 區塊紀錄每個區塊 1 byte，固定大小分段存成 BLOB；新增區塊只需改寫最後一段
+    conn.execute('''CREATE TABLE memory_log (user_id TEXT NOT NULL, chunk INTEGER NOT NULL, data BLOB NOT NULL,
+        PRIMARY KEY (user_id, chunk)) WITHOUT ROWID''')
+
+def _migrate_leaderboard(conn):
+    # seq：分數 (level/exp/money/持股) 每次變動都取全域遞增的新值，各行程只需讀 seq 大於上次同步的列
+    conn.execute("ALTER TABLE users ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX idx_users_seq ON users(seq)")
+    conn.execute("CREATE INDEX idx_users_level ON users(level DESC, exp DESC)")
+    bump = "UPDATE users SET seq = (SELECT MAX(seq) FROM users) + 1 WHERE id = {}.{};"
+    conn.execute(f"CREATE TRIGGER users_seq_insert AFTER INSERT ON users BEGIN {bump.format('NEW', 'id')} END")
+    conn.execute(f"CREATE TRIGGER users_seq_update AFTER UPDATE OF level, exp, money ON users BEGIN {bump.format('NEW', 'id')} END")
+    conn.execute(f"CREATE TRIGGER holdings_seq_insert AFTER INSERT ON holdings BEGIN {bump.format('NEW', 'user_id')} END")
+    conn.execute(f"CREATE TRIGGER holdings_seq_update AFTER UPDATE ON holdings BEGIN {bump.format('NEW', 'user_id')} END")
+    conn.execute(f"CREATE TRIGGER holdings_seq_delete AFTER DELETE ON holdings BEGIN {bump.format('OLD', 'user_id')} END")
+
+def _migrate_orders(conn):
+    conn.execute('''CREATE TABLE orders (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+        symbol TEXT NOT NULL, side TEXT NOT NULL CHECK (side IN ('buy', 'sell')), qty INTEGER NOT NULL CHECK (qty > 0),
+        status TEXT NOT NULL DEFAULT 'pending', created REAL NOT NULL, settled REAL, price REAL, note TEXT)''')
+    # 部分索引只含待成交的委託，撮合時不必掃過歷史委託
+    conn.execute("CREATE INDEX idx_orders_pending ON orders(id) WHERE status = 'pending'")
+    conn.execute("CREATE INDEX idx_orders_user ON orders(user_id, id)")
+
+def _migrate_user_version(conn):
+    # version：樂觀鎖版本號。任何寫入者 (原子更新、撮合、任務獎勵) 改到分數都會 +1，
+    # UserSession 寫回時以 WHERE version=? 偵測期間是否被其他人改過
+    conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    conn.execute('''CREATE TRIGGER users_version AFTER UPDATE OF level, exp, money ON users
+        BEGIN UPDATE users SET version = version + 1 WHERE id = NEW.id; END''')
+
+MIGRATIONS = [_migrate_base, _migrate_normalize_users, _migrate_leases, _migrate_ticks, _migrate_log_index,
+              _migrate_missions, _migrate_memory, _migrate_leaderboard, _migrate_orders, _migrate_user_version]
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, data TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS system_state (key TEXT PRIMARY KEY, value TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS logs (timestamp REAL, message TEXT)''')
-    conn.commit()
-    conn.close()
-    
+    with transaction() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for migrate in MIGRATIONS[version:]: migrate(conn)
+        conn.execute(f"PRAGMA user_version={len(MIGRATIONS)}")
+
     if not get_user("frank"):
         default_user = {"name": "Frank", "password": "x", "level": 1, "exp": 0, "money": 1000, "stocks": {}}
         save_user("frank", default_user)
 
+# --- 使用者 (Users) ---
+def _write_user(conn, user_id, data):
+    conn.execute('''INSERT INTO users (id, name, password, level, exp, money) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET name=excluded.name, password=excluded.password,
+        level=excluded.level, exp=excluded.exp, money=excluded.money''',
+        (user_id, data.get("name", user_id), data.get("password", ""),
+         int(data.get("level", 1)), int(data.get("exp", 0)), int(data.get("money", 0))))
+    conn.execute("DELETE FROM holdings WHERE user_id=?", (user_id,))
+    conn.executemany("INSERT INTO holdings (user_id, symbol, qty) VALUES (?, ?, ?)",
+                     [(user_id, sym, int(q)) for sym, q in data.get("stocks", {}).items() if q])
+
 def get_user(user_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT data FROM users WHERE id=?", (user_id,))
-    row = c.fetchone()
-    conn.close()
-    return json.loads(row[0]) if row else None
+    with connection() as conn:
+        row = conn.execute("SELECT name, password, level, exp, money, version FROM users WHERE id=?", (user_id,)).fetchone()
+        if not row: return None
+        stocks = dict(conn.execute("SELECT symbol, qty FROM holdings WHERE user_id=?", (user_id,)).fetchall())
+    name, password, level, exp, money, version = row
+    return {"name": name, "password": password, "level": level, "exp": exp, "money": money, "stocks": stocks,
+            "version": version}
 
 def save_user(user_id, data):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO users (id, data) VALUES (?, ?)", (user_id, json.dumps(data)))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        _write_user(conn, user_id, data)
 
 def get_global_stock_state():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT value FROM system_state WHERE key='stock_market'")
-    row = c.fetchone()
-    conn.close()
-    return json.loads(row[0]) if row else {"prices": {}, "history": [], "last_update": 0}
+    with connection() as conn:
+        row = conn.execute("SELECT value FROM system_state WHERE key='stock_market'").fetchone()
+    return json.loads(row[0]) if row else {"prices": {}, "last_update": 0}
 
 def save_global_stock_state(state):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO system_state (key, value) VALUES (?, ?)", ('stock_market', json.dumps(state)))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO system_state (key, value) VALUES (?, ?)", ('stock_market', json.dumps(state)))
+
+# --- 股價時間序列 (Tick store) ---
+def append_ticks(ts, prices):
+    with transaction() as conn:
+        conn.executemany("INSERT OR IGNORE INTO ticks (symbol, ts, price) VALUES (?, ?, ?)",
+                         [(sym, ts, price) for sym, price in prices.items()])
+
+def get_ticks(symbol, start, end):
+    with connection() as conn:
+        return conn.execute("SELECT ts, price FROM ticks WHERE symbol=? AND ts>=? AND ts<? ORDER BY ts",
+                            (symbol, start, end)).fetchall()
 
+def get_tick_rollup(symbol, start, end, bucket):
+    # 伺服器端 OHLC：每個 bucket 一列 (bucket_ts, open, high, low, close)
+    with connection() as conn:
+        return conn.execute('''WITH b AS (
+                SELECT CAST(ts / :bucket AS INTEGER) AS k, MIN(ts) AS t0, MAX(ts) AS t1,
+                       MAX(price) AS hi, MIN(price) AS lo
+                FROM ticks WHERE symbol=:sym AND ts>=:start AND ts<:end GROUP BY k)
+            SELECT b.k * :bucket, o.price, b.hi, b.lo, c.price FROM b
+            JOIN ticks o ON o.symbol=:sym AND o.ts=b.t0
+            JOIN ticks c ON c.symbol=:sym AND c.ts=b.t1
+            ORDER BY b.k''', {"sym": symbol, "start": start, "end": end, "bucket": bucket}).fetchall()
+
+def compact_ticks(now, compact_after, retention, bucket=60):
+    # 超過 retention 的刪除；超過 compact_after 的每個 bucket 只保留最後一筆 (收盤價)
+    with transaction() as conn:
+        conn.execute("DELETE FROM ticks WHERE ts < ?", (now - retention,))
+        conn.execute('''DELETE FROM ticks WHERE ts < :cut AND (symbol, ts) NOT IN (
+            SELECT symbol, MAX(ts) FROM ticks WHERE ts < :cut GROUP BY symbol, CAST(ts / :bucket AS INTEGER))''',
+            {"cut": now - compact_after, "bucket": bucket})
+
+# --- 跨行程租約 (Cross-process leases) ---
+# 持有者續約或租約過期時才能取得；用於選出唯一的背景工作者 (例如股市 ticker)
+def try_acquire_lease(name, owner, ttl):
+    now = time.time()
+    with transaction() as conn:
+        return conn.execute('''INSERT INTO leases (name, owner, expires) VALUES (:name, :owner, :exp)
+            ON CONFLICT(name) DO UPDATE SET owner=excluded.owner, expires=excluded.expires
+            WHERE leases.owner = excluded.owner OR leases.expires < :now''',
+            {"name": name, "owner": owner, "exp": now + ttl, "now": now}).rowcount == 1
+
+def release_lease(name, owner):
+    with transaction() as conn:
+        conn.execute("DELETE FROM leases WHERE name=? AND owner=?", (name, owner))
+
+# 原子更新 (Atomic updates)：單一 UPDATE 陳述式，不需先讀出整筆資料，多分頁同時操作也不會互相覆蓋
 def add_exp(user_id, amount):
-    u = get_user(user_id)
-    if u:
-        u['exp'] += amount
-        new_level = 1 + (u['exp'] // 100)
-        if new_level > u['level']: u['level'] = new_level
-        save_user(user_id, u)
+    with transaction() as conn:
+        conn.execute("UPDATE users SET exp = exp + :amt, level = MAX(level, 1 + (exp + :amt) / 100) WHERE id = :uid",
+                     {"amt": int(amount), "uid": user_id})
+
+def add_money(user_id, amount):
+    with transaction() as conn:
+        return conn.execute("UPDATE users SET money = money + ? WHERE id=?", (int(amount), user_id)).rowcount == 1
+
+def spend_money(user_id, amount):
+    # 餘額不足時不扣款，回傳 False
+    with transaction() as conn:
+        return conn.execute("UPDATE users SET money = money - ? WHERE id=? AND money >= ?",
+                            (int(amount), user_id, int(amount))).rowcount == 1
+
+def update_user_if(user_id, version, level, exp, money):
+    # 樂觀鎖寫回：版本號不符 (期間有其他寫入) 時不更新並回傳 False
+    with transaction() as conn:
+        return conn.execute("UPDATE users SET level=?, exp=?, money=? WHERE id=? AND version=?",
+                            (int(level), int(exp), int(money), user_id, version)).rowcount == 1
+
+# --- 任務進度 (Mission progress) ---
+def bump_event_count(user_id, event, n):
+    # 回傳累加後的次數
+    with transaction() as conn:
+        conn.execute('''INSERT INTO event_counts (user_id, event, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, event) DO UPDATE SET count = count + excluded.count''', (user_id, event, int(n)))
+        return conn.execute("SELECT count FROM event_counts WHERE user_id=? AND event=?", (user_id, event)).fetchone()[0]
+
+def get_event_counts(user_id):
+    with connection() as conn:
+        return dict(conn.execute("SELECT event, count FROM event_counts WHERE user_id=?", (user_id,)).fetchall())
+
+def claim_mission(user_id, mission_id):
+    # 已領過的任務回傳 False (冪等)
+    with transaction() as conn:
+        return conn.execute("INSERT OR IGNORE INTO mission_claims (user_id, mission_id, claimed_at) VALUES (?, ?, ?)",
+                            (user_id, mission_id, time.time())).rowcount == 1
+
+# --- 排行榜 (Leaderboard) ---
+def get_score_changes(since):
+    """seq 大於 since 的使用者分數與其持股；回傳 (users, holdings, 最大 seq)。since=-1 為全量載入。"""
+    with connection() as conn:
+        # 兩個查詢在同一個讀取交易內，看到同一個快照 (中間提交的寫入不會只出現在其中一個)
+        own = not conn.in_transaction
+        if own: conn.execute("BEGIN")
+        try:
+            users = conn.execute("SELECT id, name, level, exp, money, seq FROM users WHERE seq > ? ORDER BY seq", (since,)).fetchall()
+            if not users: return [], [], since
+            holdings = conn.execute('''SELECT h.user_id, h.symbol, h.qty FROM holdings h
+                JOIN users u ON u.id = h.user_id WHERE u.seq > ?''', (since,)).fetchall()
+        finally:
+            if own: conn.commit()
+    return users, holdings, users[-1][5]
+
+# --- 交易委託 (Orders) ---
+def place_order(user_id, symbol, side, qty):
+    with transaction() as conn:
+        return conn.execute("INSERT INTO orders (user_id, symbol, side, qty, created) VALUES (?, ?, ?, ?, ?)",
+                            (user_id, symbol, side, int(qty), time.time())).lastrowid
+
+def cancel_order(user_id, order_id):
+    # 只能取消自己尚未成交的委託
+    with transaction() as conn:
+        return conn.execute("UPDATE orders SET status='cancelled', settled=? WHERE id=? AND user_id=? AND status='pending'",
+                            (time.time(), order_id, user_id)).rowcount == 1
+
+def get_orders(user_id, limit=10):
+    with connection() as conn:
+        rows = conn.execute('''SELECT id, symbol, side, qty, status, created, price, note FROM orders
+            WHERE user_id=? ORDER BY id DESC LIMIT ?''', (user_id, limit)).fetchall()
+    keys = ("id", "symbol", "side", "qty", "status", "created", "price", "note")
+    return [dict(zip(keys, r)) for r in rows]
+
+def get_pending_orders():
+    with connection() as conn:
+        return conn.execute("SELECT id, user_id, symbol, side, qty FROM orders WHERE status='pending' ORDER BY id").fetchall()
+
+def get_balances(user_ids):
+    """{user_id: (money, {symbol: qty})}，一次查詢所有相關使用者。"""
+    ids = list(user_ids)
+    if not ids: return {}
+    marks = ",".join("?" * len(ids))
+    with connection() as conn:
+        out = {uid: (money, {}) for uid, money in conn.execute(f"SELECT id, money FROM users WHERE id IN ({marks})", ids)}
+        for uid, sym, qty in conn.execute(f"SELECT user_id, symbol, qty FROM holdings WHERE user_id IN ({marks})", ids):
+            out[uid][1][sym] = qty
+    return out
+
+def settle_orders(fills, rejects, cash, shares, ts):
+    """寫入一次撮合結果。fills: [(order_id, price)]、rejects: [(order_id, 原因)]、
+    cash: {user_id: 金額變動}、shares: {(user_id, symbol): 股數變動}。"""
+    with transaction() as conn:
+        conn.executemany("UPDATE orders SET status='filled', price=?, settled=? WHERE id=?", [(p, ts, oid) for oid, p in fills])
+        conn.executemany("UPDATE orders SET status='rejected', note=?, settled=? WHERE id=?", [(why, ts, oid) for oid, why in rejects])
+        conn.executemany("UPDATE users SET money = money + ? WHERE id=?", [(int(d), uid) for uid, d in cash.items() if d])
+        conn.executemany('''INSERT INTO holdings (user_id, symbol, qty) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, symbol) DO UPDATE SET qty = qty + excluded.qty''',
+            [(uid, sym, int(d)) for (uid, sym), d in shares.items() if d])
+        conn.executemany("DELETE FROM holdings WHERE user_id=? AND symbol=? AND qty <= 0", list(shares))
+
+# --- 記憶體堆疊 (Memory stacks) ---
+def get_memory_stack(user_id):
+    # 沒有紀錄回傳 None；chunks 依序串接即為完整區塊紀錄
+    with connection() as conn:
+        row = conn.execute("SELECT yield, size FROM memory_stacks WHERE user_id=?", (user_id,)).fetchone()
+        if row is None: return None
+        counts = dict(conn.execute("SELECT kind, count FROM memory_counts WHERE user_id=?", (user_id,)).fetchall())
+        chunks = [r[0] for r in conn.execute("SELECT data FROM memory_log WHERE user_id=? ORDER BY chunk", (user_id,))]
+    return {"yield": row[0], "size": row[1], "counts": counts, "chunks": chunks}
+
+def get_memory_size(user_id):
+    with connection() as conn:
+        row = conn.execute("SELECT size FROM memory_stacks WHERE user_id=?", (user_id,)).fetchone()
+    return 0 if row is None else row[0]
+
+def get_memory_blocks(user_id, start, end, chunk_size):
+    # 區塊紀錄 [start, end) 的 bytes，只讀取涵蓋這段的 chunk
+    with connection() as conn:
+        rows = conn.execute("SELECT data FROM memory_log WHERE user_id=? AND chunk BETWEEN ? AND ? ORDER BY chunk",
+                            (user_id, start // chunk_size, max(start, end - 1) // chunk_size)).fetchall()
+    offset = start // chunk_size * chunk_size
+    return b"".join(r[0] for r in rows)[start - offset:end - offset]
+
+def append_memory_blocks(user_id, data, counts, total_yield, chunk_size):
+    """把新區塊接在 DB 現有紀錄之後；計數、收益與長度都以增量累加，多個行程同時寫入也不會互相覆蓋。
+    回傳寫入的起始位置 (大於呼叫端已知的長度，代表中間有其他行程寫入的區塊)。"""
+    with transaction() as conn:
+        row = conn.execute("SELECT size FROM memory_stacks WHERE user_id=?", (user_id,)).fetchone()
+        start = 0 if row is None else row[0]
+        conn.execute('''INSERT INTO memory_stacks (user_id, yield, size) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET yield = yield + excluded.yield, size = size + excluded.size''',
+            (user_id, int(total_yield), len(data)))
+        conn.executemany('''INSERT INTO memory_counts (user_id, kind, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, kind) DO UPDATE SET count = count + excluded.count''',
+            [(user_id, kind, int(n)) for kind, n in counts.items() if n])
+        # 只改寫最後一段 (補滿) 與之後的新段落
+        first = start // chunk_size
+        head = conn.execute("SELECT data FROM memory_log WHERE user_id=? AND chunk=?", (user_id, first)).fetchone()
+        buf = (head[0] if head else b"")[:start - first * chunk_size] + bytes(data)
+        conn.executemany('''INSERT INTO memory_log (user_id, chunk, data) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, chunk) DO UPDATE SET data=excluded.data''',
+            [(user_id, first + i // chunk_size, sqlite3.Binary(buf[i:i + chunk_size])) for i in range(0, len(buf), chunk_size)])
+    return start
+
+# --- 系統日誌 (Logs) ---
+class LogWriter:
+    """背景批次寫入日誌：累積到 batch_size 筆或經過 flush_interval 秒就以一次交易寫入。
+
+    tail 是最近訊息的記憶體環形緩衝，儀表板直接讀取，不必查詢資料庫。
+    """
+    _STOP = object()
+
+    def __init__(self, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 retention_days=LOG_RETENTION_DAYS, tail_size=LOG_TAIL_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention_days * 86400
+        self.tail = deque(maxlen=tail_size)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._last_prune = 0.0
+        with connection() as conn:
+            rows = conn.execute("SELECT timestamp, message FROM logs ORDER BY timestamp DESC LIMIT ?", (tail_size,)).fetchall()
+        self.tail.extend(reversed(rows))
+        self._thread.start()
+
+    def write(self, message):
+        entry = (time.time(), message)
+        self.tail.append(entry)
+        self._queue.put(entry)
+
+    def recent(self, limit=10):
+        return [m for _, m in list(self.tail)[-limit:]][::-1]
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch, stopping = ([], True) if item is self._STOP else ([item], False)
+            deadline = time.monotonic() + self.flush_interval
+            while not stopping and len(batch) < self.batch_size:
+                try: item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty: break
+                if item is self._STOP: stopping = True
+                else: batch.append(item)
+            try:
+                if batch: self._write(batch)
+                self._prune()
+            except sqlite3.Error:
+                pass  # 例如 DB 鎖定逾時：這批日誌放棄，不影響前台
+            finally:
+                for _ in range(len(batch) + stopping): self._queue.task_done()
+
+    def _write(self, batch):
+        for attempt in range(3):
+            try:
+                with transaction() as conn:
+                    conn.executemany("INSERT INTO logs (timestamp, message) VALUES (?, ?)", batch)
+                return
+            except sqlite3.OperationalError:
+                if attempt == 2: raise
+                time.sleep(0.1 * (attempt + 1))
+
+    def _prune(self):
+        now = time.time()
+        if now - self._last_prune < 3600: return
+        self._last_prune = now
+        with transaction() as conn:
+            conn.execute("DELETE FROM logs WHERE timestamp < ?", (now - self.retention,))
+
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+def get_log_writer():
+    global _log_writer
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None: _log_writer = LogWriter()
+    return _log_writer
 
 def add_log(message):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO logs (timestamp, message) VALUES (?, ?)", (time.time(), message))
-    conn.commit()
-    conn.close()
+    get_log_writer().write(message)
 
 def get_logs(limit=10):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT message FROM logs ORDER BY timestamp DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute("SELECT message FROM logs ORDER BY timestamp DESC LIMIT ?", (limit,)).fetchall()
     return [r[0] for r in rows]
+
+def recent_logs(limit=10):
+    return get_log_writer().recent(limit)
+
+
+# --- 效能量測 (Instrumentation) ---
+# 在模組載入時就包裝好，`from database import ...` 拿到的都是有計時的版本
+INSTRUMENTED = ["init_db", "get_user", "save_user", "get_global_stock_state", "save_global_stock_state",
+                "append_ticks", "get_ticks", "get_tick_rollup", "compact_ticks", "try_acquire_lease", "release_lease",
+                "add_exp", "add_money", "spend_money", "update_user_if", "bump_event_count", "get_event_counts",
+                "claim_mission", "get_score_changes", "place_order", "cancel_order", "get_orders", "get_pending_orders",
+                "get_balances", "settle_orders", "get_memory_stack", "get_memory_size", "get_memory_blocks",
+                "append_memory_blocks", "add_log", "get_logs", "recent_logs"]
+for _name in INSTRUMENTED: globals()[_name] = telemetry.timed(f"db.{_name}")(globals()[_name])
@@ -0,0 +1,125 @@
+# dsp_engine.py - 數位訊號處理引擎 (DSP Engine)
+from functools import lru_cache
+
+import numpy as np
+
+FS = 500            # 取樣率 (Hz)，與舊版 1 秒 500 點相同
+CHUNK = 1 << 16     # 長訊號分塊產生/處理，記憶體只和 CHUNK 有關
+NFFT = 1024         # STFT / Welch 每個 frame 的點數
+HOP = NFFT // 2
+MAX_COLUMNS = 400   # 頻譜圖最多的時間欄數，再長的訊號也只保留這麼多
+PREVIEW_MAX = 200_000
+
+
+def tones(n_or_idx, f1, a1, f2, a2, fs=FS):
+    t = np.asarray(n_or_idx, dtype=float) / fs if np.ndim(n_or_idx) else np.arange(n_or_idx) / fs
+    return a1 * np.sin(2 * np.pi * f1 * t) + a2 * np.sin(2 * np.pi * f2 * t)
+
+
+def signal_chunks(params, n, chunk=CHUNK, fs=FS):
+    """依序產生訊號片段，不會一次建立整條訊號。"""
+    for start in range(0, n, chunk):
+        yield tones(np.arange(start, min(n, start + chunk)), *params, fs=fs)
+
+
+@lru_cache(maxsize=8)
+def window(nfft):
+    w = np.hanning(nfft)
+    w.flags.writeable = False
+    return w
+
+
+def _frames(chunks, nfft, hop):
+    # 把任意長度的片段串接成重疊 frame；只保留不足一個 frame 的尾巴
+    carry = np.empty(0)
+    for c in chunks:
+        buf = np.concatenate([carry, c]) if len(carry) else c
+        count = 0 if len(buf) < nfft else 1 + (len(buf) - nfft) // hop
+        if count:
+            yield np.lib.stride_tricks.sliding_window_view(buf, nfft)[::hop][:count]
+        carry = buf[count * hop:]
+
+
+def _freeze(*arrays):
+    for a in arrays: a.flags.writeable = False
+    return arrays if len(arrays) > 1 else arrays[0]
+
+
+@lru_cache(maxsize=8)
+def preview(params, n=500, fs=FS):
+    """時域預覽 (前 n 點)。"""
+    idx = np.arange(n)
+    return _freeze(idx / fs, tones(idx, *params, fs=fs))
+
+
+@lru_cache(maxsize=32)
+def spectrum(params, n, fs=FS, nfft=NFFT):
+    """頻譜強度。短訊號直接對整段做 rfft；長訊號以 Welch 平均 (Hann 視窗、50% 重疊) 逐塊累加。"""
+    if n <= 4 * nfft:
+        y = tones(n, *params, fs=fs)
+        return _freeze(np.fft.rfftfreq(n, 1 / fs), np.abs(np.fft.rfft(y)))
+    win = window(nfft)
+    acc = np.zeros(nfft // 2 + 1)
+    buf = np.empty(((CHUNK + nfft) // (nfft // 2) + 1, nfft))  # 重複使用的加窗工作區
+    frames = 0
+    for block in _frames(signal_chunks(params, n, fs=fs), nfft, nfft // 2):
+        work = np.multiply(block, win, out=buf[:len(block)])
+        acc += (np.abs(np.fft.rfft(work, axis=1)) ** 2).sum(axis=0)
+        frames += len(block)
+    # 換算回與整段 rfft 相近的振幅尺度
+    mag = np.sqrt(acc / max(frames, 1)) * (n / win.sum())
+    return _freeze(np.fft.rfftfreq(nfft, 1 / fs), mag)
+
+
+@lru_cache(maxsize=16)
+def spectrogram(params, n, fs=FS, nfft=NFFT, hop=HOP, columns=MAX_COLUMNS):
+    """整段訊號的 STFT 頻譜圖 (dB)；frame 太多時平均合併成最多 columns 欄，記憶體固定。"""
+    total = 0 if n < nfft else 1 + (n - nfft) // hop
+    cols = max(1, min(columns, total))
+    image = np.zeros((nfft // 2 + 1, cols))
+    counts = np.zeros(cols)
+    win = window(nfft)
+    i = 0
+    for block in _frames(signal_chunks(params, n, fs=fs), nfft, hop):
+        power = np.abs(np.fft.rfft(block * win, axis=1)) ** 2
+        col = (np.arange(i, i + len(block)) * cols) // max(total, 1)
+        np.add.at(image.T, col, power)
+        np.add.at(counts, col, 1)
+        i += len(block)
+    image /= np.maximum(counts, 1)
+    times = (np.arange(cols) + 0.5) * (n / fs) / cols
+    return _freeze(times, np.fft.rfftfreq(nfft, 1 / fs), 10 * np.log10(image + 1e-12))
+
+
+class StftStream:
+    """即時 STFT：每次 push() 新樣本就計算新的 frame，寫入預先配置的環形緩衝。"""
+
+    def __init__(self, params, fs=FS, nfft=NFFT, hop=HOP, columns=120):
+        self.params, self.fs, self.nfft, self.hop = params, fs, nfft, hop
+        self.freqs = np.fft.rfftfreq(nfft, 1 / fs)
+        self.ring = np.full((nfft // 2 + 1, columns), -120.0)
+        self.head = 0            # 下一欄寫入位置
+        self.frames = 0
+        self.sample = 0          # 已產生的樣本數 (相位連續)
+        self._carry = np.empty(0)
+        self._win = window(nfft)
+
+    def push(self, count):
+        chunk = tones(np.arange(self.sample, self.sample + count), *self.params, fs=self.fs)
+        self.sample += count
+        buf = np.concatenate([self._carry, chunk])
+        new = 0 if len(buf) < self.nfft else 1 + (len(buf) - self.nfft) // self.hop
+        if new:
+            block = np.lib.stride_tricks.sliding_window_view(buf, self.nfft)[::self.hop][:new]
+            db = 10 * np.log10(np.abs(np.fft.rfft(block * self._win, axis=1)) ** 2 + 1e-12)
+            cols = self.ring.shape[1]
+            pos = (self.head + np.arange(len(db))) % cols
+            self.ring[:, pos[-cols:]] = db[-cols:].T
+            self.head = (self.head + len(db)) % cols
+            self.frames += new
+        self._carry = buf[new * self.hop:]
+        return new
+
+    def image(self):
+        # 依時間順序 (最舊在左) 排列的頻譜圖
+        return np.roll(self.ring, -self.head, axis=1)
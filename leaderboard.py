@@ -0,0 +1,150 @@
+# leaderboard.py - 排行榜 (Leaderboard)
+import threading
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from config import STOCKS_DATA
+from database import get_score_changes
+
+BOARDS = {"level": "等級 (Level / EXP)", "worth": "身價 (Net Worth)"}
+
+
+class _Board:
+    """已排序的 key 串列 (分數取負 -> 由高到低，最後一欄為列號以打破同分)；名次與插入位置都用二分搜尋。"""
+
+    def __init__(self):
+        self.keys = []
+        self.by_row = {}
+
+    def update(self, row, key):
+        old = self.by_row.get(row)
+        if old == key: return
+        if old is not None: del self.keys[bisect_left(self.keys, old)]
+        insort(self.keys, key)
+        self.by_row[row] = key
+
+    def rebuild(self, keys):
+        self.keys = keys
+        self.by_row = {k[-1]: k for k in keys}
+
+    def rank(self, row):
+        key = self.by_row.get(row)
+        return None if key is None else bisect_left(self.keys, key) + 1
+
+    def top(self, n):
+        return self.keys[:n]
+
+
+class Leaderboard:
+    """每個行程一份的記憶體排行榜。
+
+    - users.seq 由 DB trigger 在分數或持股變動時遞增，sync() 只讀取上次之後變動的列 (add_exp、save_user、
+      其他行程的寫入都一樣)，逐筆以 bisect 更新名次。
+    - 股價每個 tick 變動時 reprice() 以 持股矩陣 @ 價格向量 一次重算所有人的身價，再整體重新排序。
+    """
+
+    def __init__(self, symbols=None):
+        self.symbols = list(symbols or STOCKS_DATA)
+        self._col = {s: i for i, s in enumerate(self.symbols)}
+        self.prices = np.array([STOCKS_DATA[s]["base"] for s in self.symbols], dtype=float)
+        self.uids, self.names, self.row = [], [], {}
+        self.level = np.zeros(0, dtype=np.int64)
+        self.exp = np.zeros(0, dtype=np.int64)
+        self.money = np.zeros(0, dtype=np.int64)
+        self.shares = np.zeros((0, len(self.symbols)))
+        self.boards = {name: _Board() for name in BOARDS}
+        self.seq = -1
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # 同一時間只有一個 sync，避免較舊的變動覆蓋較新的
+
+    def __len__(self):
+        return len(self.uids)
+
+    def _grow(self, n):
+        cap = len(self.level)
+        if n <= cap: return
+        cap = max(n, 2 * cap, 1024)
+        for name in ("level", "exp", "money"):
+            arr = np.zeros(cap, dtype=np.int64)
+            arr[:len(self.uids)] = getattr(self, name)[:len(self.uids)]
+            setattr(self, name, arr)
+        shares = np.zeros((cap, len(self.symbols)))
+        shares[:len(self.uids)] = self.shares[:len(self.uids)]
+        self.shares = shares
+
+    def _worth(self, rows):
+        return self.money[rows] + self.shares[rows] @ self.prices
+
+    def sync(self):
+        """套用 DB 中 seq 大於上次同步的變動；回傳更新的使用者數。"""
+        with self._sync_lock:
+            users, holdings, seq = get_score_changes(self.seq)
+            if not users: return 0
+            self._apply(users, holdings)
+            self.seq = seq
+        return len(users)
+
+    def _apply(self, users, holdings):
+        with self._lock:
+            self._grow(len(self.uids) + len(users))
+            rows = []
+            for uid, name, level, exp, money, _ in users:
+                i = self.row.get(uid)
+                if i is None:
+                    i = self.row[uid] = len(self.uids)
+                    self.uids.append(uid)
+                    self.names.append(name)
+                self.names[i] = name
+                self.level[i], self.exp[i], self.money[i] = level, exp, money
+                self.shares[i] = 0
+                rows.append(i)
+            for uid, symbol, qty in holdings:
+                col, i = self._col.get(symbol), self.row.get(uid)
+                if col is not None and i is not None: self.shares[i, col] = qty
+            if len(rows) > len(self.uids) // 4:
+                self._rebuild()  # 大量變動 (例如首次載入) 直接整體排序比逐筆插入快
+            else:
+                worth = self._worth(np.array(rows))
+                for i, w in zip(rows, worth.tolist()):
+                    self.boards["level"].update(i, (-int(self.level[i]), -int(self.exp[i]), i))
+                    self.boards["worth"].update(i, (-w, i))
+
+    def _rebuild(self):
+        n = len(self.uids)
+        level, exp = -self.level[:n], -self.exp[:n]
+        order = np.lexsort((exp, level))  # 穩定排序：同分依列號
+        self.boards["level"].rebuild(list(zip(level[order].tolist(), exp[order].tolist(), order.tolist())))
+        self._rebuild_worth()
+
+    def _rebuild_worth(self):
+        neg = -self._worth(slice(0, len(self.uids)))
+        order = np.argsort(neg, kind="stable")
+        self.boards["worth"].rebuild(list(zip(neg[order].tolist(), order.tolist())))
+
+    def reprice(self, prices):
+        """市場 tick：以新價格一次重算所有人的身價並重排 (prices 為 {代號: 價格})。"""
+        self.sync()
+        with self._lock:
+            self.prices = np.array([prices.get(s, p) for s, p in zip(self.symbols, self.prices)], dtype=float)
+            if self.uids: self._rebuild_worth()
+
+    # --- 查詢 ---
+    def rank(self, board, uid):
+        with self._lock:
+            row = self.row.get(uid)
+            return None if row is None else self.boards[board].rank(row)
+
+    def top(self, board, n=10):
+        with self._lock:
+            rows = []
+            for pos, key in enumerate(self.boards[board].top(n), 1):
+                i = key[-1]
+                rows.append({"rank": pos, "uid": self.uids[i], "name": self.names[i], "level": int(self.level[i]),
+                             "exp": int(self.exp[i]), "worth": float(self._worth(i))})
+            return rows
+
+    def worth(self, uid):
+        with self._lock:
+            i = self.row.get(uid)
+            return None if i is None else float(self._worth(i))
@@ -0,0 +1,306 @@
+# logic_sim.py - 組合電路模擬器 (Bit-parallel Netlist Simulator)
+import re
+import random
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+GATES = ["AND", "OR", "XOR", "NAND", "NOR", "XNOR"]
+MAX_INPUTS = 24
+MAX_GATES = 400                  # 整個網表的運算子總數上限
+MAX_DEPTH = 100                  # 括號 / NOT 巢狀深度上限
+MAX_TABLE_BYTES = 128 << 20      # 同時存在的真值表欄位 (slot) 總大小上限
+TABLE_CACHE_BYTES = MAX_TABLE_BYTES  # 已計算輸出欄位的快取總大小 (所有電路合計)；不小於單一電路上限
+
+# 優先順序：NOT > AND/NAND > XOR/XNOR > OR/NOR
+_BINARY = {
+    "AND": 3, "&": 3, "*": 3, "NAND": 3,
+    "XOR": 2, "^": 2, "XNOR": 2,
+    "OR": 1, "|": 1, "+": 1, "NOR": 1,
+}
+_ALIAS = {"&": "AND", "*": "AND", "^": "XOR", "|": "OR", "+": "OR"}
+_TOKEN = re.compile(r"\s*(?:([A-Za-z_][A-Za-z0-9_]*)|([01])|(\S))")
+
+# 每個 uint64 word 內，第 b 個輸入位元 (b < 6) 的固定樣式
+_LOW_PATTERNS = [0xAAAAAAAAAAAAAAAA, 0xCCCCCCCCCCCCCCCC, 0xF0F0F0F0F0F0F0F0,
+                 0xFF00FF00FF00FF00, 0xFFFF0000FFFF0000, 0xFFFFFFFF00000000]
+_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _tokenize(text):
+    tokens = []
+    for name, const, sym in _TOKEN.findall(text):
+        if name: tokens.append(name.upper() if name.upper() in _BINARY or name.upper() == "NOT" else name)
+        elif const: tokens.append(int(const))
+        elif sym: tokens.append(sym)
+    return tokens
+
+
+class _Parser:
+    """布林運算式 -> 巢狀 tuple：("VAR", name) / ("CONST", 0|1) / ("NOT", x) / (GATE, x, y, ...)。"""
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.depth = 0
+        self.gates = 0           # 建立的運算子節點數
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected=None):
+        tok = self.peek()
+        if tok is None or (expected is not None and tok != expected):
+            raise ValueError(f"語法錯誤：預期 {expected or '運算元'}，得到 {tok}")
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.expr(1)
+        if self.peek() is not None: raise ValueError(f"語法錯誤：多餘的 {self.peek()}")
+        return node
+
+    def node(self, *node):
+        self.gates += 1
+        if self.gates > MAX_GATES: raise ValueError(f"電路過大 (超過 {MAX_GATES} 個閘)")
+        return node
+
+    def expr(self, min_prec):
+        self.depth += 1
+        if self.depth > MAX_DEPTH: raise ValueError(f"巢狀過深 (超過 {MAX_DEPTH} 層)")
+        left = self.unary()
+        while isinstance(self.peek(), str) and _BINARY.get(self.peek(), 0) >= min_prec:
+            op = self.take()
+            right = self.expr(_BINARY[op] + 1)
+            left = self.node(_ALIAS.get(op, op), left, right)
+        self.depth -= 1
+        return left
+
+    def unary(self):
+        tok = self.peek()
+        if tok in ("NOT", "~", "!"):
+            self.take()
+            self.depth += 1
+            if self.depth > MAX_DEPTH: raise ValueError(f"巢狀過深 (超過 {MAX_DEPTH} 層)")
+            node = self.node("NOT", self.unary())
+            self.depth -= 1
+            return node
+        if tok == "(":
+            self.take()
+            node = self.expr(1)
+            self.take(")")
+            return node
+        if isinstance(tok, int):
+            self.take()
+            return ("CONST", tok)
+        if isinstance(tok, str) and re.match(r"[A-Za-z_]", tok):
+            self.take()
+            if tok in GATES and self.peek() == "(":  # 函式形式 NAND(A, B, C)
+                self.take("(")
+                args = [self.expr(1)]
+                while self.peek() == ",":
+                    self.take()
+                    args.append(self.expr(1))
+                self.take(")")
+                if len(args) < 2: raise ValueError(f"語法錯誤：{tok} 至少需要兩個輸入")
+                return self.node(tok, *args)
+            return ("VAR", tok)
+        raise ValueError("語法錯誤：運算式不完整" if tok is None else f"語法錯誤：無法解析 {tok}")
+
+
+class Circuit:
+    """編譯後的組合電路。
+
+    所有輸入組合 (2^n 列真值表) 以位元打包成 uint64 word，每個閘對整個欄位做一次 NumPy 位元運算，
+    所以 20 個輸入 (約 100 萬列) 只需要幾十個向量運算。輸入順序 = 真值表由左到右 (第一個為 MSB)。
+    """
+
+    def __init__(self, inputs, outputs, program, n_slots):
+        if len(inputs) > MAX_INPUTS: raise ValueError(f"輸入過多 ({len(inputs)} > {MAX_INPUTS})")
+        self.inputs, self.outputs = inputs, outputs
+        self.program = program          # [(dest, op, (src, ...)), ...] 已依拓撲排序
+        self.n_slots = n_slots
+        self.rows = 1 << len(inputs)
+        need = n_slots * max(1, self.rows // 64) * 8
+        if need > MAX_TABLE_BYTES: raise ValueError(f"電路過大 (需要 {need >> 20} MB，上限 {MAX_TABLE_BYTES >> 20} MB)")
+
+    def input_columns(self, out=None):
+        n, words = len(self.inputs), max(1, self.rows // 64)
+        cols = np.empty((n, words), dtype=np.uint64) if out is None else out
+        w = np.arange(words, dtype=np.uint64)
+        for k in range(n):
+            b = n - 1 - k
+            if b < 6: cols[k] = np.uint64(_LOW_PATTERNS[b])
+            else: cols[k] = np.where((w >> np.uint64(b - 6)) & np.uint64(1), _ONES, np.uint64(0))
+        return cols
+
+    def evaluate_all(self):
+        """回傳 {輸出名稱: 打包後的 uint64 欄位}；結果放在有位元組上限的共用快取。"""
+        table = _tables.get(self)
+        if table is not None: return table
+        words = max(1, self.rows // 64)
+        slots = np.empty((self.n_slots, words), dtype=np.uint64)
+        self.input_columns(out=slots[:len(self.inputs)])
+        for dest, op, src in self.program:
+            out = slots[dest]
+            if op == "CONST": out[...] = _ONES if src[0] else np.uint64(0)
+            elif op == "NOT": np.invert(slots[src[0]], out=out)
+            else:
+                fn = {"AND": np.bitwise_and, "NAND": np.bitwise_and, "OR": np.bitwise_or,
+                      "NOR": np.bitwise_or, "XOR": np.bitwise_xor, "XNOR": np.bitwise_xor}[op]
+                fn(slots[src[0]], slots[src[1]], out=out)
+                for s in src[2:]: fn(out, slots[s], out=out)
+                if op in ("NAND", "NOR", "XNOR"): np.invert(out, out=out)
+        if self.rows < 64:
+            slots &= np.uint64((1 << self.rows) - 1)
+        # 只複製輸出欄位，其餘 slot 隨 slots 一起釋放
+        table = {name: slots[slot].copy() for name, slot in self.outputs.items()}
+        _tables.put(self, table)
+        return table
+
+    def column(self, name):
+        """把打包欄位展開為長度 2^n 的 0/1 陣列 (第 r 列 = 輸入組合 r)。"""
+        packed = self.evaluate_all()[name].astype("<u8")
+        return np.unpackbits(packed.view(np.uint8), bitorder="little")[:self.rows]
+
+    def evaluate(self, **values):
+        row = 0
+        for name in self.inputs: row = (row << 1) | (1 if values[name] else 0)
+        return {name: int((packed[row >> 6] >> np.uint64(row & 63)) & np.uint64(1))
+                for name, packed in self.evaluate_all().items()}
+
+    def ones(self):
+        return {name: int(np.bitwise_count(p).sum()) if hasattr(np, "bitwise_count")
+                else int(np.unpackbits(p.view(np.uint8)).sum()) for name, p in self.evaluate_all().items()}
+
+
+class _TableCache:
+    """以位元組數為上限的 LRU：Circuit -> 輸出欄位。編譯結果 (程式) 很小，另由 lru_cache 快取。"""
+
+    def __init__(self, budget=TABLE_CACHE_BYTES):
+        self.budget = budget
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, circuit):
+        with self._lock:
+            table = self._items.get(circuit)
+            if table is not None: self._items.move_to_end(circuit)
+            return table
+
+    def put(self, circuit, table):
+        size = sum(col.nbytes for col in table.values())
+        if size > self.budget: return  # 單一電路就超過上限：不快取，下次重算
+        with self._lock:
+            old = self._items.pop(circuit, None)
+            if old is not None: self.nbytes -= sum(col.nbytes for col in old.values())
+            self._items[circuit] = table
+            self.nbytes += size
+            while self.nbytes > self.budget:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= sum(col.nbytes for col in evicted.values())
+
+
+_tables = _TableCache()
+
+
+@lru_cache(maxsize=64)
+def compile_circuit(text):
+    """編譯網表 (每行 `名稱 = 運算式`) 或單一運算式 (輸出名為 Y)；依相依關係做拓撲排序。"""
+    lines = [ln.split("#", 1)[0].strip() for ln in text.replace(";", "\n").splitlines()]
+    lines = [ln for ln in lines if ln]
+    if not lines: raise ValueError("空白電路")
+    defs, gates = {}, 0
+    for ln in lines:
+        if "=" in ln:
+            name, rhs = (p.strip() for p in ln.split("=", 1))
+            if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name): raise ValueError(f"非法的訊號名稱：{name}")
+        else:
+            if len(lines) > 1: raise ValueError(f"網表每行需為 `名稱 = 運算式`：{ln}")
+            name, rhs = "Y", ln
+        if name in defs: raise ValueError(f"訊號重複定義：{name}")
+        parser = _Parser(rhs)
+        defs[name] = parser.parse()
+        gates += parser.gates
+        if gates > MAX_GATES: raise ValueError(f"電路過大 (超過 {MAX_GATES} 個閘)")
+
+    def refs(node, acc):
+        if node[0] == "VAR": acc[node[1]] = None
+        elif node[0] != "CONST":
+            for child in node[1:]: refs(child, acc)
+        return acc
+
+    deps = {name: refs(tree, {}) for name, tree in defs.items()}
+    # 輸入依第一次出現的順序排列 (A, B, CIN ...)，也就是真值表的欄位順序
+    inputs = [v for d in deps.values() for v in d if v not in defs]
+    inputs = list(dict.fromkeys(inputs))
+
+    # Kahn 拓撲排序
+    pending = {name: {d for d in ds if d in defs} for name, ds in deps.items()}
+    order, ready = [], sorted(n for n, d in pending.items() if not d)
+    users = {n: [m for m, d in pending.items() if n in d] for n in defs}
+    while ready:
+        n = ready.pop(0)
+        order.append(n)
+        for m in users[n]:
+            pending[m].discard(n)
+            if not pending[m] and m not in order and m not in ready: ready.append(m)
+    if len(order) != len(defs): raise ValueError("電路有迴路 (combinational loop)")
+
+    n_in = len(inputs)
+    slot = {name: i for i, name in enumerate(inputs)}
+    program = []  # slot 編號：輸入 0..n-1，之後每條指令一個
+
+    def emit(node):
+        kind = node[0]
+        if kind == "VAR": return slot[node[1]]
+        args = (node[1],) if kind == "CONST" else tuple(emit(child) for child in node[1:])
+        program.append((n_in + len(program), kind, args))
+        return program[-1][0]
+
+    for name in order: slot[name] = emit(defs[name])
+    program, phys, n_slots = _allocate(n_in, program, {slot[name] for name in defs})
+    return Circuit(inputs, {name: phys[slot[name]] for name in defs}, program, n_slots)
+
+
+def _allocate(n_in, program, keep):
+    """虛擬 slot -> 實體 slot：中間值在最後一次被讀取後釋放給之後的指令重用，
+    所以同時存在的欄位數只和電路「寬度」有關，不是閘數。keep 為需保留到最後的 slot (輸出)。"""
+    last = {}
+    for i, (_, op, src) in enumerate(program):
+        if op != "CONST":
+            for s in src: last[s] = i
+    phys = {v: v for v in range(n_in)}
+    free, n_slots, out = [], n_in, []
+    for i, (dest, op, src) in enumerate(program):
+        args = src if op == "CONST" else tuple(phys[s] for s in src)
+        # 先配置目的 slot 再釋放來源：多輸入閘以 out 累加，目的不能與來源重疊
+        if free: phys[dest] = free.pop()
+        else: phys[dest], n_slots = n_slots, n_slots + 1
+        out.append((phys[dest], op, args))
+        if op != "CONST":
+            for s in set(src):
+                if last[s] == i and s not in keep: free.append(phys[s])
+    return out, phys, n_slots
+
+
+# --- 測驗題產生 (Quiz generation) ---
+_GATE_PROMPT = re.compile(r"A=([01]),\s*B=([01]).*\[(\w+)\]")
+
+def gate_question(gate, a, b):
+    """與 questions.txt 相同格式的題目，答案由編譯後的電路計算。"""
+    out = compile_circuit(f"A {gate} B").evaluate(A=a, B=b)["Y"]
+    return {"id": f"GEN-{gate}-{a}{b}", "difficulty": 1, "prompt": f"輸入 A={a}, B={b}，經過 [{gate}] 閘輸出？",
+            "options": ["0", "1", "Z", "X"], "answer": str(out)}
+
+def random_gate_question(rng=random):
+    return gate_question(rng.choice(GATES), rng.randint(0, 1), rng.randint(0, 1))
+
+def answer_gate_prompt(prompt):
+    """題庫中 LOGIC 閘題目的正確答案 (由電路模擬)；不是閘題目則回傳 None。"""
+    m = _GATE_PROMPT.search(prompt)
+    if not m or m.group(3) not in GATES: return None
+    return gate_question(m.group(3), int(m.group(1)), int(m.group(2)))["answer"]
@@ -0,0 +1,161 @@
+# market.py - 股市引擎 (Market Engine)
+import os
+import time
+import sqlite3
+import uuid
+import atexit
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import STOCKS_DATA
+from database import (
+    transaction, try_acquire_lease, release_lease,
+    get_global_stock_state, save_global_stock_state,
+    append_ticks, get_ticks, get_tick_rollup, compact_ticks, add_log
+)
+from trading import settle
+
+TICK_SECONDS = float(os.environ.get("CITYOS_TICK_SECONDS", "2.0"))
+LEASE_NAME = "market_ticker"
+# 幾何布朗運動參數 (每個 tick)：sigma 約等於舊版 uniform(-3%, +3%) 的標準差
+DRIFT = 0.0
+VOLATILITY = 0.0173
+
+# --- 歷史資料保存 (Retention) ---
+TICK_RETENTION = float(os.environ.get("CITYOS_TICK_RETENTION_DAYS", "7")) * 86400
+TICK_COMPACT_AFTER = float(os.environ.get("CITYOS_TICK_COMPACT_AFTER_HOURS", "6")) * 3600
+COMPACT_EVERY = 600
+
+# --- 圖表 (Chart) ---
+CHART_WINDOWS = {"5 分鐘": 300, "1 小時": 3600, "24 小時": 86400, "7 天": 7 * 86400}
+CHART_POINTS = 300
+ROLLUP_UNITS = (1, 60, 3600)  # 1s / 1m / 1h
+
+
+def bucket_seconds(window, max_points, tick_seconds=TICK_SECONDS):
+    # 回傳 None 表示原始 tick 數已在上限內；否則取能壓到 max_points 以下、且為 1s/1m/1h 整數倍的 bucket
+    if window / tick_seconds <= max_points: return None
+    need = window / max_points
+    for unit in ROLLUP_UNITS:
+        if need <= unit * 60 or unit == ROLLUP_UNITS[-1]:
+            return unit * int(np.ceil(need / unit))
+
+
+class MarketEngine:
+    """每個行程一個背景 ticker；多個行程之間透過 DB 租約選出唯一的 leader 負責計算價格。
+
+    Leader 一次以 NumPy 向量運算更新所有 STOCKS_DATA 代號並寫回 DB，並在同一交易內撮合委託佇列；
+    其他行程 (follower) 只讀取最新狀態。頁面渲染只讀 snapshot()，不再寫入。
+    """
+
+    def __init__(self, tick_seconds=TICK_SECONDS, drift=DRIFT, volatility=VOLATILITY, seed=None):
+        self.symbols = list(STOCKS_DATA)
+        self.base = np.array([STOCKS_DATA[s]["base"] for s in self.symbols], dtype=float)
+        self.tick_seconds = tick_seconds
+        self.drift = drift
+        self.volatility = volatility
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._rng = np.random.default_rng(seed)
+        self._snapshot = None
+        self._charts = {}
+        self._listeners = []
+        self._last_compact = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- 價格模型 ---
+    def next_prices(self, prev):
+        z = self._rng.standard_normal(len(prev))
+        step = (self.drift - 0.5 * self.volatility ** 2) + self.volatility * z
+        return np.maximum(1.0, np.round(prev * np.exp(step), 2))
+
+    def _vector(self, prices):
+        return np.array([prices.get(s, b) for s, b in zip(self.symbols, self.base)], dtype=float)
+
+    # --- 單次 tick ---
+    def step(self, now=None):
+        now = time.time() if now is None else now
+        with transaction():
+            self.is_leader = try_acquire_lease(LEASE_NAME, self.owner, self.tick_seconds * 3)
+            state = get_global_stock_state()
+            if self.is_leader and now - state.get("last_update", 0) >= self.tick_seconds:
+                prices = self.next_prices(self._vector(state["prices"]))
+                state["prices"] = dict(zip(self.symbols, prices.tolist()))
+                state["last_update"] = now
+                state.pop("history", None)  # 舊版 40 筆 JSON 歷史，已改存 ticks 表
+                save_global_stock_state(state)
+                append_ticks(now, state["prices"])
+                settle(state["prices"], now)  # 同一個交易內以新價格撮合所有待成交委託
+        if self.is_leader and now - self._last_compact >= COMPACT_EVERY:
+            compact_ticks(now, TICK_COMPACT_AFTER, TICK_RETENTION)
+            self._last_compact = now
+        self._publish(state)
+        return state
+
+    def _publish(self, state):
+        current = self._snapshot
+        if current is not None and current["last_update"] == state.get("last_update", 0): return
+        snap = {
+            "prices": state["prices"] or {s: float(b) for s, b in zip(self.symbols, self.base)},
+            "last_update": state.get("last_update", 0),
+        }
+        self._snapshot = snap
+        for fn in list(self._listeners):
+            try: fn(snap["prices"])
+            except sqlite3.Error: pass  # 訂閱者的 DB 錯誤不影響 ticker
+            except Exception as e: add_log(f"⚠️ [MARKET] 訂閱者錯誤 {type(e).__name__}: {e}")
+
+    def subscribe(self, fn):
+        """每次有新價格時呼叫 fn(prices)；在 ticker 執行緒中執行。"""
+        self._listeners.append(fn)
+        if self._snapshot is not None: fn(self._snapshot["prices"])
+
+    def chart(self, symbol, window, max_points=CHART_POINTS):
+        """回傳 [time, open, high, low, close] DataFrame，點數不超過 max_points；同一 tick 內重複呼叫走快取。"""
+        snap = self.snapshot()
+        key = (symbol, window, max_points)
+        cached = self._charts.get(key)
+        if cached is not None and cached[0] == snap["last_update"]: return cached[1]
+
+        end = (snap["last_update"] or time.time()) + 1e-3
+        bucket = bucket_seconds(window, max_points, self.tick_seconds)
+        if bucket is None:
+            rows = [(ts, p, p, p, p) for ts, p in get_ticks(symbol, end - window, end)]
+        else:
+            rows = get_tick_rollup(symbol, end - window, end, bucket)
+        frame = pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close"])
+        frame.insert(0, "time", [datetime.fromtimestamp(ts) for ts in frame["ts"]])
+        self._charts[key] = (snap["last_update"], frame)
+        return frame
+
+    def snapshot(self):
+        # 渲染時只讀記憶體；ticker 尚未跑過時才同步執行一次
+        if self._snapshot is None: self.step()
+        return self._snapshot
+
+    # --- 背景執行緒 ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="market-ticker", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: self.step()
+            except sqlite3.OperationalError: pass  # DB 暫時忙碌：下個 tick 再試
+            except Exception as e:  # 其他錯誤記錄後繼續，ticker 不能停 (價格凍結、委託不再撮合)
+                add_log(f"⚠️ [MARKET] tick 失敗 {type(e).__name__}: {e}")
+            self._stop.wait(self.tick_seconds)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout=self.tick_seconds)
+        if self.is_leader:
+            try: release_lease(LEASE_NAME, self.owner)
+            except sqlite3.Error: pass
@@ -0,0 +1,144 @@
+# memory_stack.py - 記憶體堆疊狀態 (Memory Stack State)
+import os
+import sqlite3
+import atexit
+import threading
+from array import array
+
+from database import transaction, get_memory_stack, get_memory_size, get_memory_blocks, append_memory_blocks
+
+# 類型: (價格, 每 cycle 收益)；順序即區塊紀錄中的類型代碼，只能在尾端新增
+BLOCK_TYPES = {"Arr": (500, 50), "Node": (200, 20)}
+KINDS = list(BLOCK_TYPES)
+CHUNK_BLOCKS = 4096     # 每段 BLOB 的區塊數
+FLUSH_INTERVAL = float(os.environ.get("CITYOS_MEMORY_FLUSH_INTERVAL", "1.0"))
+
+
+class MemoryStack:
+    """單一玩家的堆疊：各類型計數與總收益隨配置 O(1) 更新，區塊紀錄為 1 byte/區塊 的 array。
+
+    前 synced 個區塊與 DB 中的紀錄一致 (順序相同)，之後是本行程尚未寫入的區塊。
+    """
+
+    def __init__(self, counts=None, log=b""):
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.counts.update(counts or {})
+        self.total_yield = sum(BLOCK_TYPES[k][1] * n for k, n in self.counts.items())
+        self.log = array("B", log)
+        self.synced = len(self.log)
+
+    def __len__(self):
+        return len(self.log)
+
+    def allocate(self, kind):
+        self.counts[kind] += 1
+        self.total_yield += BLOCK_TYPES[kind][1]
+        self.log.append(KINDS.index(kind))
+
+    def tail(self, n):
+        return [KINDS[code] for code in self.log[-n:]]
+
+    def pending(self):
+        return self.log[self.synced:].tobytes()
+
+    def merge(self, data):
+        """其他行程已寫入 DB、本地還沒有的區塊：插在尚未寫入的區塊之前。"""
+        self.log[self.synced:self.synced] = array("B", data)
+        self.synced += len(data)
+        for code, kind in enumerate(KINDS):
+            n = data.count(code)
+            self.counts[kind] += n
+            self.total_yield += BLOCK_TYPES[kind][1] * n
+
+
+def _delta(data):
+    counts = {kind: data.count(code) for code, kind in enumerate(KINDS)}
+    return counts, sum(BLOCK_TYPES[k][1] * n for k, n in counts.items())
+
+
+class MemoryStore:
+    """每個行程一份的堆疊快取：第一次讀取才從 DB 載入，之後配置只改記憶體。
+
+    背景執行緒每 flush_interval 秒把各玩家新增的區塊以一次交易「附加」到 DB (計數以增量累加)，
+    不會用本地的舊資料覆蓋其他行程的配置；每次寫入的量只和新增的區塊數有關。
+    同一玩家的 session 分散在多個行程時，get() 比對 DB 長度，補上其他行程寫入的區塊。
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._stacks = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # flush 與 refresh 互斥，同一批區塊不會合併兩次
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, uid, refresh=True):
+        with self._lock:
+            stack = self._stacks.get(uid)
+        if stack is not None and not refresh: return stack
+        if stack is not None:
+            # flush 進行中就略過，flush 本身會補上缺少的區塊
+            if self._flush_lock.acquire(blocking=False):
+                try: self._refresh(uid, stack, get_memory_size(uid))
+                finally: self._flush_lock.release()
+            return stack
+        row = get_memory_stack(uid)
+        loaded = MemoryStack() if row is None else MemoryStack(row["counts"], b"".join(row["chunks"]))
+        with self._lock:
+            return self._stacks.setdefault(uid, loaded)
+
+    def _refresh(self, uid, stack, size):
+        # 呼叫端需持有 _flush_lock
+        if size <= stack.synced: return
+        data = get_memory_blocks(uid, stack.synced, size, CHUNK_BLOCKS)
+        with self._lock: stack.merge(data)
+
+    def allocate(self, uid, kind):
+        stack = self.get(uid, refresh=False)
+        with self._lock:
+            self._dirty.add(uid)
+            stack.allocate(kind)
+        return stack
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                batch = [(uid, self._stacks[uid], self._stacks[uid].pending()) for uid in dirty]
+            batch = [b for b in batch if b[2]]
+            if not batch: return 0
+            try:
+                with transaction():
+                    done = []
+                    for uid, stack, data in batch:
+                        start = append_memory_blocks(uid, data, *_delta(data), CHUNK_BLOCKS)
+                        missing = get_memory_blocks(uid, stack.synced, start, CHUNK_BLOCKS) if start > stack.synced else b""
+                        done.append((stack, missing, len(data)))
+            except sqlite3.Error:
+                with self._lock: self._dirty |= dirty  # 區塊仍在 pending，下次 flush 重試
+                raise
+            with self._lock:
+                for stack, missing, n in done:
+                    stack.merge(missing)
+                    stack.synced += n
+        return len(batch)
+
+    # --- 背景執行緒 ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-flusher", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try: self.flush()
+            except sqlite3.Error: pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout=5)
+        try: self.flush()
+        except sqlite3.Error: pass
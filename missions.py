@@ -0,0 +1,135 @@
+# missions.py - 任務引擎 (Mission Engine)
+import os
+import sqlite3
+import atexit
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from database import transaction, bump_event_count, get_event_counts, claim_mission, add_money, add_log
+
+MISSIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "missions.txt")
+FLUSH_INTERVAL = float(os.environ.get("CITYOS_MISSION_FLUSH_INTERVAL", "1.0"))
+FLUSH_THRESHOLD = 500  # 累積事件數達門檻就提早 flush
+
+
+def load_missions(path=MISSIONS_FILE):
+    missions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("|")
+            if len(parts) != 5: continue
+            mid, name, desc, reward, event = parts
+            missions.append({"id": mid, "name": name, "desc": desc, "reward": int(reward), "event": event})
+    return missions
+
+
+class MissionEngine:
+    """頁面呼叫 emit() 只累加記憶體計數；背景執行緒批次寫入 DB 並發放獎勵。
+
+    同一事件類型的任務依 ID 排成階梯：第 k 個任務需要累積 k 次事件。
+    完成判定用 event -> 已排序門檻陣列 的索引做二分搜尋，不逐一掃描所有任務。
+    """
+
+    def __init__(self, path=MISSIONS_FILE, flush_interval=FLUSH_INTERVAL, flush_threshold=FLUSH_THRESHOLD):
+        self.missions = load_missions(path)
+        by_event = defaultdict(list)
+        for i, m in enumerate(self.missions): by_event[m["event"]].append(i)
+        self.by_event = {}
+        for event, idx in by_event.items():
+            idx.sort(key=lambda i: self.missions[i]["id"])
+            for goal, i in enumerate(idx, 1): self.missions[i]["goal"] = goal
+            self.by_event[event] = (np.arange(1, len(idx) + 1), np.array(idx))
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = Counter()
+        self._pending_total = 0
+        self._completed = defaultdict(list)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def events(self):
+        return list(self.by_event)
+
+    def emit(self, uid, event, n=1):
+        if event not in self.by_event: return
+        with self._lock:
+            self._pending[(uid, event)] += n
+            self._pending_total += n
+            full = self._pending_total >= self.flush_threshold
+        if full: self._wake.set()
+
+    def newly_completed(self, event, old, new):
+        goals, idx = self.by_event[event]
+        lo, hi = np.searchsorted(goals, [old, new], side="right")
+        return [self.missions[i] for i in idx[lo:hi]]
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending, self._pending_total = self._pending, Counter(), 0
+            if not batch: return []
+            rewards, done = Counter(), []
+            try:
+                # 整批一次交易：計數、領取紀錄與獎勵要嘛全部成功，要嘛全部回滾
+                with transaction():
+                    for (uid, event), n in batch.items():
+                        new = bump_event_count(uid, event, n)
+                        for m in self.newly_completed(event, new - n, new):
+                            if claim_mission(uid, m["id"]):
+                                rewards[uid] += m["reward"]
+                                done.append((uid, m))
+                    for uid, amount in rewards.items(): add_money(uid, amount)
+            except sqlite3.Error:
+                with self._lock:  # 下次 flush 重試
+                    self._pending.update(batch)
+                    self._pending_total += sum(batch.values())
+                raise
+        with self._lock:
+            for uid, m in done: self._completed[uid].append(m)
+        for uid, m in done: add_log(f"[MISSION] {uid} 完成 {m['id']} {m['name']} (+${m['reward']})")
+        return done
+
+    def pop_completed(self, uid):
+        with self._lock:
+            return self._completed.pop(uid, [])
+
+    def progress(self, uid):
+        """每種事件的目前次數與下一個未完成任務 (含尚未 flush 的計數)。"""
+        counts = Counter(get_event_counts(uid))
+        with self._lock:
+            for (u, event), n in self._pending.items():
+                if u == uid: counts[event] += n
+        rows = []
+        for event, (goals, idx) in self.by_event.items():
+            k = int(np.searchsorted(goals, counts[event], side="right"))
+            nxt = self.missions[idx[k]] if k < len(idx) else None
+            rows.append({"event": event, "count": counts[event], "done": k, "total": len(idx), "next": nxt})
+        return rows
+
+    # --- 背景執行緒 ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mission-flusher", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try: self.flush()
+            except sqlite3.Error: pass
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None: self._thread.join(timeout=5)
+        try: self.flush()
+        except sqlite3.Error: pass
@@ -0,0 +1,77 @@
+# pid_sweep.py - PID 批次模擬 (Vectorized PID Sweep)
+import numpy as np
+
+STEPS = 50
+PLANT_GAIN = 0.1      # 慣性：curr += out * 0.1
+TOLERANCE = 2.0       # 與頁面判定「穩定」相同：|y - target| < 2
+KP_RANGE = (0.0, 5.0)
+KI_RANGE = (0.0, 2.0)
+KD_RANGE = (0.0, 5.0)
+
+
+def simulate(kp, ki, kd, target, steps=STEPS):
+    """同時模擬所有參數組；kp/ki/kd 可為純量或相同形狀的陣列，回傳 shape (steps, *kp.shape)。"""
+    kp, ki, kd = np.broadcast_arrays(np.asarray(kp, float), np.asarray(ki, float), np.asarray(kd, float))
+    curr = np.zeros(kp.shape)
+    integral = np.zeros(kp.shape)
+    prev_err = np.zeros(kp.shape)
+    err = np.empty(kp.shape)
+    out = np.empty(kp.shape)
+    history = np.empty((steps,) + kp.shape)
+    with np.errstate(over="ignore", invalid="ignore"):
+        for t in range(steps):
+            np.subtract(target, curr, out=err)
+            integral += err
+            # out = kp*err + ki*integral + kd*(err - prev_err)，全部原地運算避免暫存陣列
+            np.subtract(err, prev_err, out=prev_err)
+            prev_err *= kd
+            np.multiply(kp, err, out=out)
+            out += prev_err
+            out += ki * integral
+            out *= PLANT_GAIN
+            curr += out
+            history[t] = curr
+            prev_err[...] = err
+    return history
+
+
+def metrics(history, target, tol=TOLERANCE):
+    """每組參數的 overshoot (%)、settling time (步數，未收斂為 inf) 與 steady-state error。"""
+    with np.errstate(over="ignore", invalid="ignore"):
+        final = history[-1]
+        sse = np.abs(final - target)
+        overshoot = np.maximum(0.0, history.max(axis=0) - target) / max(abs(target), 1) * 100
+        outside = ~(np.abs(history - target) < tol)
+    steps = history.shape[0]
+    last_out = steps - 1 - np.argmax(outside[::-1], axis=0)
+    settling = np.where(outside[-1], np.inf, np.where(outside.any(axis=0), last_out + 1, 0).astype(float))
+    stable = np.isfinite(final) & ~outside[-1]
+    overshoot = np.where(np.isfinite(overshoot), overshoot, np.inf)
+    sse = np.where(np.isfinite(sse), sse, np.inf)
+    return {"overshoot": overshoot, "settling": settling, "sse": sse, "stable": stable}
+
+
+def cost(m):
+    # 先比收斂速度，再懲罰超越量；不穩定者成本為 inf
+    return np.where(m["stable"], m["settling"] + 0.1 * m["overshoot"] + m["sse"], np.inf)
+
+
+def sweep(ki, target, n=100, kp_range=KP_RANGE, kd_range=KD_RANGE):
+    """固定 Ki，在 Kp x Kd 網格上掃描 (n x n 組)，回傳軸與各指標矩陣 (列 = Kd, 行 = Kp)。"""
+    kp_axis = np.linspace(*kp_range, n)
+    kd_axis = np.linspace(*kd_range, n)
+    kp, kd = np.meshgrid(kp_axis, kd_axis)
+    m = metrics(simulate(kp, ki, kd, target), target)
+    return {"kp": kp_axis, "kd": kd_axis, **m}
+
+
+def auto_tune(target, n=22, kp_range=KP_RANGE, ki_range=KI_RANGE, kd_range=KD_RANGE):
+    """三維網格 (預設 22^3 約 1 萬組) 一次模擬，回傳成本最低的 (kp, ki, kd) 與其指標。"""
+    kp, ki, kd = np.meshgrid(np.linspace(*kp_range, n), np.linspace(*ki_range, n), np.linspace(*kd_range, n),
+                             indexing="ij")
+    m = metrics(simulate(kp, ki, kd, target), target)
+    c = cost(m)
+    best = np.unravel_index(np.argmin(c), c.shape)
+    if not np.isfinite(c[best]): return None
+    return {"kp": float(kp[best]), "ki": float(ki[best]), "kd": float(kd[best]),
+            **{k: float(v[best]) for k, v in m.items()}}
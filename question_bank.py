@@ -0,0 +1,118 @@
+# question_bank.py - 題庫引擎 (Question Bank)
+import os
+import random
+import threading
+
+import numpy as np
+import streamlit as st
+
+from logic_sim import answer_gate_prompt
+
+QUESTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.txt")
+
+
+class QuestionBank:
+    """questions.txt (ID|難度|題目|選項,選項,...|答案) 的索引與作答統計。
+
+    LOGIC 閘題的答案在載入時由 logic_sim 模擬產生。
+    題目依 ID 前綴 (LOGIC-, MATH-, SYS-) 與難度分組成索引陣列；每位使用者以
+    lazy Fisher-Yates 抽題，每次 O(1) 且整輪不重複。統計值存在 NumPy 陣列中。
+    """
+
+    def __init__(self, path=QUESTIONS_FILE):
+        self.path = path
+        ids, diffs, prompts, options, answers = [], [], [], [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("|")
+                if len(parts) != 5: continue
+                ids.append(parts[0]); diffs.append(int(parts[1])); prompts.append(parts[2])
+                options.append(parts[3].split(",")); answers.append(parts[4])
+        # LOGIC 閘題 (NAND/NOR/XOR ...) 的答案由編譯後的電路模擬得出，不依賴檔案中手寫的答案
+        for i, qid in enumerate(ids):
+            if qid.startswith("LOGIC-"):
+                simulated = answer_gate_prompt(prompts[i])
+                if simulated is not None: answers[i] = simulated
+        self.ids, self.prompts, self.options, self.answers = ids, prompts, options, answers
+        self.by_id = {}
+        for i, qid in enumerate(ids): self.by_id.setdefault(qid, i)
+
+        prefixes = [qid.split("-", 1)[0] for qid in ids]
+        self.categories = sorted(set(prefixes))
+        code = {c: i for i, c in enumerate(self.categories)}
+        self.category = np.array([code[p] for p in prefixes], dtype=np.uint8)
+        self.difficulty = np.array(diffs, dtype=np.uint8)
+        self.levels = sorted(set(diffs))
+
+        self._pools = {}
+        for cat in [None] + self.categories:
+            for diff in [None] + self.levels:
+                mask = np.ones(len(ids), dtype=bool)
+                if cat is not None: mask &= self.category == code[cat]
+                if diff is not None: mask &= self.difficulty == diff
+                self._pools[(cat, diff)] = np.flatnonzero(mask).astype(np.int32)
+
+        self.attempts = np.zeros(len(ids), dtype=np.uint32)
+        self.correct = np.zeros(len(ids), dtype=np.uint32)
+        self._decks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def pool(self, category=None, difficulty=None):
+        return self._pools.get((category, difficulty), self._pools[(None, None)][:0])
+
+    def draw(self, uid, category=None, difficulty=None):
+        """抽出下一題的索引；同一使用者在一輪內不會重複，抽完自動開新一輪。"""
+        pool = self.pool(category, difficulty)
+        if len(pool) == 0: return None
+        key = (uid, category, difficulty)
+        with self._lock:
+            deck = self._decks.get(key)
+            if deck is None or deck[0] >= len(pool): deck = self._decks[key] = [0, {}]
+            i, swaps = deck
+            j = random.randrange(i, len(pool))
+            picked, swaps[j] = swaps.get(j, j), swaps.get(i, i)
+            swaps.pop(i, None)
+            deck[0] = i + 1
+        return int(pool[picked])
+
+    def question(self, idx):
+        return {"id": self.ids[idx], "difficulty": int(self.difficulty[idx]), "prompt": self.prompts[idx],
+                "options": self.options[idx], "answer": self.answers[idx]}
+
+    def check(self, idx, answer):
+        ok = answer == self.answers[idx]
+        with self._lock:
+            self.attempts[idx] += 1
+            if ok: self.correct[idx] += 1
+        return ok
+
+    def accuracy(self, idx):
+        n = int(self.attempts[idx])
+        return int(self.correct[idx]) / n if n else None
+
+    def inherit_stats(self, old):
+        # 熱重載時沿用相同 ID 題目的統計
+        for i, qid in enumerate(self.ids):
+            j = old.by_id.get(qid)
+            if j is not None:
+                self.attempts[i] = old.attempts[j]
+                self.correct[i] = old.correct[j]
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_bank(path, mtime_ns):
+    return QuestionBank(path)
+
+_last_bank = None
+
+def get_bank(path=QUESTIONS_FILE):
+    # 以檔案 mtime 作為快取鍵：檔案更新後下一次 rerun 自動重新載入
+    global _last_bank
+    bank = _load_bank(path, os.stat(path).st_mtime_ns)
+    if _last_bank is not None and _last_bank is not bank and _last_bank.path == path:
+        bank.inherit_stats(_last_bank)
+    _last_bank = bank
+    return bank
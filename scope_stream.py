@@ -0,0 +1,88 @@
+# scope_stream.py - 示波器訊號串流 (Oscilloscope Streaming)
+import os
+import time
+import threading
+
+import numpy as np
+
+ENCODINGS = {"uart": "UART 8N1", "manchester": "Manchester (IEEE 802.3)"}
+BAUD = 20                # 每秒位元數 (刻意放慢，畫面上看得出每個位元)
+SAMPLES_PER_BIT = 16     # 需為偶數：Manchester 每個位元分成兩個半位元
+IDLE_BITS = 12           # 每次重送之間的閒置位元
+WINDOW_BITS = 40         # 畫面顯示的位元數 = 環形緩衝長度 / SAMPLES_PER_BIT
+NOISE = 0.12             # 高斯雜訊標準差 (邏輯電位為 0 / 1)
+SCOPE_FPS = int(os.environ.get("CITYOS_SCOPE_FPS", "10"))
+
+
+def uart_bits(data):
+    """8N1 框架：起始位元 0、8 個資料位元 (LSB 在前)、停止位元 1。"""
+    raw = np.frombuffer(bytes(data), dtype=np.uint8)[:, None]
+    bits = np.unpackbits(raw, axis=1, bitorder="little")
+    n = len(raw)
+    return np.hstack([np.zeros((n, 1), np.uint8), bits, np.ones((n, 1), np.uint8)]).ravel()
+
+
+def manchester(bits):
+    """IEEE 802.3：0 = 高→低、1 = 低→高；回傳半位元電位序列 (長度為 2 倍)。"""
+    bits = np.asarray(bits, dtype=np.uint8)
+    return np.column_stack([1 - bits, bits]).ravel()
+
+
+def encode(data, encoding, idle_bits=IDLE_BITS, samples_per_bit=SAMPLES_PER_BIT):
+    """一次完整重送的乾淨波形 (float32)：閒置 + 編碼後的資料。"""
+    if encoding == "uart":
+        # 線路閒置為高電位，起始位元的下降沿標示每個字元
+        halves = np.repeat(np.concatenate([np.ones(idle_bits, np.uint8), uart_bits(data)]), 2)
+    elif encoding == "manchester":
+        bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8), bitorder="little")
+        halves = np.concatenate([np.zeros(2 * idle_bits, np.uint8), manchester(bits)])
+    else: raise ValueError(f"未知編碼：{encoding}")
+    return np.repeat(halves, samples_per_bit // 2).astype(np.float32)
+
+
+class ScopeStream:
+    """共用的訊號來源：依經過時間把 (編碼波形 + 雜訊) 寫入預先配置的環形緩衝。
+
+    同一目標/編碼的所有觀看者共用一個 stream，畫面只呼叫 window() 讀取；
+    產生的樣本數只和經過時間有關，與觀看人數及 FPS 無關。
+    """
+
+    def __init__(self, data, encoding, baud=BAUD, samples_per_bit=SAMPLES_PER_BIT, window_bits=WINDOW_BITS,
+                 noise=NOISE, seed=None):
+        self.encoding = encoding
+        self.samples_per_bit = samples_per_bit
+        self.rate = baud * samples_per_bit          # 每秒樣本數
+        self.frame = encode(data, encoding, samples_per_bit=samples_per_bit)
+        self.ring = np.zeros(window_bits * samples_per_bit, dtype=np.float32)
+        self.head = 0            # 下一個寫入位置 (也是最舊的樣本)
+        self.sample = 0          # 已產生的樣本數 (在 frame 中的相位)
+        self.noise = noise
+        self._t0 = None
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def push(self, count):
+        cap = len(self.ring)
+        if count > cap:  # 落後超過一整個畫面：較舊的樣本反正會被覆蓋，直接跳過
+            self.sample += count - cap
+            count = cap
+        idx = (self.sample + np.arange(count)) % len(self.frame)
+        chunk = self.frame[idx] + self._rng.normal(0.0, self.noise, count).astype(np.float32)
+        pos = (self.head + np.arange(count)) % cap
+        self.ring[pos] = chunk
+        self.head = (self.head + count) % cap
+        self.sample += count
+        return count
+
+    def advance(self, now=None):
+        """補上從上次到現在應產生的樣本；第一次呼叫先填滿一個畫面。"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._t0 is None: self._t0 = now - len(self.ring) / self.rate
+            due = int((now - self._t0) * self.rate) - self.sample
+            return self.push(due) if due > 0 else 0
+
+    def window(self):
+        """(依時間排序的樣本副本, 最新樣本的序號)。"""
+        with self._lock:
+            return np.concatenate((self.ring[self.head:], self.ring[:self.head])), self.sample
@@ -0,0 +1,54 @@
+# services.py - 跨 session 共用的背景服務 (Shared Services)
+# 每個服務第一次被頁面用到時才 import 並啟動 (cache_resource 每個行程一份)，
+# 沒開過 Math 頁的 worker 不會載入 sympy。
+import streamlit as st
+
+
+@st.cache_resource
+def bootstrap():
+    # 資料庫 migration 與預設帳號：每個行程只做一次，不是每次 rerun
+    from database import init_db
+    import telemetry
+    init_db()
+    telemetry.start_exporter()
+    return True
+
+@st.cache_resource
+def get_market():
+    # 每個行程只啟動一個 ticker (cache_resource 跨 session 共用)
+    from market import MarketEngine
+    return MarketEngine().start()
+
+@st.cache_resource
+def get_leaderboard():
+    from leaderboard import Leaderboard
+    board = Leaderboard()
+    board.sync()
+    get_market().subscribe(board.reprice)  # 每個 tick 重新估值
+    return board
+
+@st.cache_resource
+def get_missions():
+    from missions import MissionEngine
+    return MissionEngine().start()
+
+@st.cache_resource
+def get_memory():
+    from memory_stack import MemoryStore
+    return MemoryStore().start()
+
+@st.cache_resource
+def get_arena():
+    from arena_bench import ArenaExecutor
+    return ArenaExecutor()
+
+@st.cache_resource
+def get_symbolic():
+    from symbolic import SymbolicService
+    return SymbolicService()
+
+@st.cache_resource(max_entries=64)
+def get_scope(hex_data, encoding):
+    # 同一目標/編碼的觀看者共用一個訊號來源
+    from scope_stream import ScopeStream
+    return ScopeStream(bytes.fromhex(hex_data), encoding)
@@ -0,0 +1,170 @@
+# symbolic.py - 符號運算服務 (Symbolic Compute Service)
+import os
+import queue
+import atexit
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+
+import sympy as sp
+
+SYMPY_WORKERS = int(os.environ.get("CITYOS_SYMPY_WORKERS", "2"))
+PARSE_TIMEOUT = 3.0      # 解析 + 微分
+INTEGRAL_TIMEOUT = 5.0   # 積分最容易卡住，逾時就只回傳部分結果
+STARTUP_TIMEOUT = 60.0   # 子行程啟動 (import sympy) 不計入運算逾時
+CACHE_SIZE = 256
+
+X = sp.symbols('x')
+
+
+class WorkerUnavailable(TimeoutError):
+    """沒有可用的子行程 (全部忙碌或啟動失敗)：運算根本沒有執行，與運算逾時不同。"""
+
+
+# --- 子行程內執行 (runs inside worker processes) ---
+def _parse_and_diff(expr_str):
+    expr = sp.sympify(expr_str)
+    return expr, sp.diff(expr, X)
+
+def _integrate(expr):
+    return sp.integrate(expr, X)
+
+def _serve(conn):
+    conn.send((True, "ready"))
+    while True:
+        try: fn, args = conn.recv()
+        except EOFError: return
+        try: conn.send((True, fn(*args)))
+        except Exception as e: conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """單一子行程；逾時時直接 terminate，下一次使用時再重新啟動。"""
+    _ctx = mp.get_context("spawn")
+
+    def __init__(self):
+        self.proc = None
+        self.conn = None
+
+    def _start(self):
+        self.conn, child = self._ctx.Pipe()
+        self.proc = self._ctx.Process(target=_serve, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+        if not self.conn.poll(STARTUP_TIMEOUT):
+            self.kill()
+            raise WorkerUnavailable("運算核心啟動失敗 (worker failed to start)")
+        self.conn.recv()
+
+    def ensure_started(self):
+        if self.proc is None or not self.proc.is_alive(): self._start()
+
+    def call(self, fn, args, timeout):
+        self.ensure_started()
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise TimeoutError(f"{fn.__name__} 超過 {timeout:g} 秒")
+        ok, value = self.conn.recv()
+        if not ok: raise ValueError(value)
+        return value
+
+    def kill(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.join()
+            self.conn.close()
+        self.proc = self.conn = None
+
+
+class SymbolicService:
+    """sympify / diff / integrate / lambdify 的快取與逾時控制。
+
+    以正規化後的運算式 (srepr) 為鍵做 LRU 快取，同時記住原始字串 -> 正規鍵的對應，
+    所以只有 X 軸範圍改變的 rerun 完全不需要重算。積分逾時時快取部分結果 (只有微分)；
+    因為 worker 全忙而沒算到的積分不快取。
+    """
+
+    def __init__(self, workers=SYMPY_WORKERS, cache_size=CACHE_SIZE,
+                 parse_timeout=PARSE_TIMEOUT, integral_timeout=INTEGRAL_TIMEOUT):
+        self.parse_timeout = parse_timeout
+        self.integral_timeout = integral_timeout
+        self.cache_size = cache_size
+        self._idle = queue.Queue()
+        self._workers = [_Worker() for _ in range(workers)]
+        for w in self._workers: threading.Thread(target=self._warm, args=(w,), daemon=True).start()
+        self._aliases = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.hits = self.misses = self.timeouts = 0
+        atexit.register(self.shutdown)
+
+    def _warm(self, worker):
+        # 背景預先啟動子行程，第一次查詢不必等 import sympy
+        try: worker.ensure_started()
+        except TimeoutError: pass
+        self._idle.put(worker)
+        self._ready.set()
+
+    def _call(self, fn, args, timeout):
+        self._ready.wait(STARTUP_TIMEOUT)
+        try: worker = self._idle.get(timeout=timeout)
+        except queue.Empty: raise WorkerUnavailable("運算核心忙碌中 (all workers busy)")
+        try: return worker.call(fn, args, timeout)
+        except WorkerUnavailable: raise
+        except TimeoutError:
+            with self._lock: self.timeouts += 1
+            raise
+        finally: self._idle.put(worker)
+
+    def _get(self, cache, key):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        return None
+
+    def _put(self, cache, key, value):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size: cache.popitem(last=False)
+
+    def analyze(self, expr_str):
+        """回傳 {expr, deriv, integ, latex, func, partial}；integ 在積分逾時時為 None。"""
+        key = self._get(self._aliases, expr_str)
+        result = self._get(self._results, key) if key is not None else None
+        if result is None:
+            # 新字串：先解析取得正規鍵，可能與快取中寫法不同但等價的運算式相同
+            expr, deriv = self._call(_parse_and_diff, (expr_str,), self.parse_timeout)
+            key = sp.srepr(expr)
+            self._put(self._aliases, expr_str, key)
+            result = self._get(self._results, key)
+        with self._lock:
+            if result is not None: self.hits += 1
+            else: self.misses += 1
+        if result is not None: return result
+
+        busy = False
+        try: integ = self._call(_integrate, (expr,), self.integral_timeout)
+        except WorkerUnavailable: integ, busy = None, True
+        except TimeoutError: integ = None
+        result = {
+            "expr": expr, "deriv": deriv, "integ": integ, "partial": integ is None,
+            "latex": {"expr": sp.latex(expr), "deriv": sp.latex(deriv),
+                      "integ": None if integ is None else sp.latex(integ)},
+            "func": sp.lambdify(X, expr, "numpy"),
+        }
+        # 只有真的算過且逾時的部分結果才快取；沒有空閒 worker 時下次查詢重試積分
+        if not busy: self._put(self._results, key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "timeouts": self.timeouts,
+                    "hit_rate": self.hits / total if total else 0.0, "size": len(self._results)}
+
+    def shutdown(self):
+        for w in self._workers: w.kill()
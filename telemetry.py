@@ -0,0 +1,186 @@
+# telemetry.py - 效能量測 (Instrumentation)
+import os
+import time
+import json
+import random
+import atexit
+import cProfile
+import threading
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+WINDOW = int(os.environ.get("CITYOS_TELEMETRY_WINDOW", "1024"))            # 每個指標保留最近幾筆樣本
+CHART_SAMPLE = float(os.environ.get("CITYOS_TELEMETRY_CHART_SAMPLE", "0.1"))  # 量測圖表 JSON 大小的抽樣比例
+EXPORT_PATH = os.environ.get("CITYOS_TELEMETRY_EXPORT", "")                   # .json 輸出 JSON，其他輸出 Prometheus 文字
+EXPORT_INTERVAL = float(os.environ.get("CITYOS_TELEMETRY_EXPORT_INTERVAL", "15"))
+ADMINS = {u.strip() for u in os.environ.get("CITYOS_ADMINS", "").split(",") if u.strip()}
+# 例如 CITYOS_PROFILE=0.2：20% 的 rerun 開 cProfile，超過 PROFILE_SLOW_MS 的才存檔
+PROFILE_RATE = float(os.environ.get("CITYOS_PROFILE", "0") or 0)
+PROFILE_SLOW_MS = float(os.environ.get("CITYOS_PROFILE_SLOW_MS", "500"))
+PROFILE_DIR = os.environ.get("CITYOS_PROFILE_DIR", "profiles")
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """固定大小的環形樣本緩衝：記錄是 O(1)，百分位數在讀取時才排序計算。"""
+
+    def __init__(self, unit="seconds", window=WINDOW):
+        self.unit = unit
+        self.samples = array("d", bytes(8 * window))
+        self.count = 0       # 累計筆數 (不受視窗限制)
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        data = sorted(self.samples[:min(self.count, len(self.samples))])
+        if not data: return {"unit": self.unit, "count": 0, "sum": 0.0, "max": 0.0, **{f"p{p}": 0.0 for p in PERCENTILES}}
+        pct = {f"p{p}": data[min(len(data) - 1, int(len(data) * p / 100))] for p in PERCENTILES}
+        return {"unit": self.unit, "count": self.count, "sum": self.total, "max": data[-1], **pct}
+
+
+class Registry:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._hist = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, value, unit="seconds"):
+        with self._lock:
+            h = self._hist.get(name)
+            if h is None: h = self._hist[name] = Histogram(unit, self.window)
+            h.add(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._hist.items())}
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+
+
+REGISTRY = Registry()
+record = REGISTRY.record
+snapshot = REGISTRY.snapshot
+
+
+@contextmanager
+def timer(name):
+    t0 = time.perf_counter()
+    try: yield
+    finally: record(name, time.perf_counter() - t0)
+
+
+def timed(name):
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: record(name, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def chart_size(fig, name):
+    # 抽樣量測 Plotly 圖表序列化後的大小 (序列化本身有成本，所以不是每張都量)；name 為 頁面.圖表
+    if random.random() >= CHART_SAMPLE: return
+    import plotly.io as pio
+    t0 = time.perf_counter()
+    size = len(pio.to_json(fig, validate=False))
+    record(f"chart.{name}.serialize", time.perf_counter() - t0)
+    record(f"chart.{name}.bytes", size, unit="bytes")
+
+
+def is_admin(uid):
+    return uid in ADMINS
+
+
+# --- 慢 rerun 的 cProfile 抽樣 ---
+_profile_lock = threading.Lock()   # 同一時間只允許一個 profiler
+captures = deque(maxlen=20)        # 最近存下的 .prof 檔 [(時間, 標籤, 毫秒, 路徑)]
+
+
+@contextmanager
+def rerun(label):
+    """量測整個 rerun；開啟 CITYOS_PROFILE 時依比例抽樣 cProfile，慢的才寫檔。"""
+    prof = None
+    if PROFILE_RATE > 0 and random.random() < PROFILE_RATE and _profile_lock.acquire(blocking=False):
+        prof = cProfile.Profile()
+        try: prof.enable()
+        except ValueError:  # 其他 profiler 正在執行
+            prof = None
+            _profile_lock.release()
+    t0 = time.perf_counter()
+    try: yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        record("rerun", elapsed)
+        if prof is not None:
+            prof.disable()
+            _profile_lock.release()
+            if elapsed * 1000 >= PROFILE_SLOW_MS: _save_profile(prof, label, elapsed)
+
+
+def _save_profile(prof, label, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe = "".join(c if c.isalnum() else "_" for c in label.encode("ascii", "ignore").decode()).strip("_") or "rerun"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}-{int(elapsed * 1000)}ms.prof")
+    prof.dump_stats(path)
+    captures.append((time.time(), label, elapsed * 1000, path))
+
+
+# --- 匯出 (Export) ---
+def to_json(snap=None):
+    return json.dumps({"ts": time.time(), "metrics": snap or snapshot()}, indent=2)
+
+
+def to_prometheus(snap=None):
+    lines, families = [], {}
+    for name, s in (snap or snapshot()).items(): families.setdefault(s["unit"], []).append((name, s))
+    for unit, rows in families.items():
+        metric = f"cityos_{unit}"
+        lines.append(f"# TYPE {metric} summary")
+        for name, s in rows:
+            for p in PERCENTILES: lines.append(f'{metric}{{name="{name}",quantile="{p / 100}"}} {s[f"p{p}"]:.6g}')
+            lines.append(f'{metric}_sum{{name="{name}"}} {s["sum"]:.6g}')
+            lines.append(f'{metric}_count{{name="{name}"}} {s["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def export(path=EXPORT_PATH):
+    if not path: return
+    body = to_json() if path.endswith(".json") else to_prometheus()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(body)
+    os.replace(tmp, path)  # 原子替換，scraper 不會讀到寫一半的檔案
+
+
+_exporter = None
+
+def start_exporter(path=EXPORT_PATH, interval=EXPORT_INTERVAL):
+    """每 interval 秒把統計寫到檔案 (Prometheus textfile collector 或 JSON)；未設定路徑則不啟動。"""
+    global _exporter
+    if not path or _exporter is not None: return _exporter
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try: export(path)
+            except OSError: pass
+
+    _exporter = threading.Thread(target=run, name="telemetry-exporter", daemon=True)
+    _exporter.start()
+
+    @atexit.register
+    def _final():
+        stop.set()
+        try: export(path)
+        except OSError: pass
+    return _exporter
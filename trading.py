@@ -0,0 +1,70 @@
+# trading.py - 交易委託與撮合 (Order Queue & Settlement)
+import time
+
+import numpy as np
+
+from config import STOCKS_DATA
+from database import (
+    transaction, place_order as _insert_order, get_pending_orders, get_balances, settle_orders, add_log
+)
+
+SIDES = {"buy": "買進 (Buy)", "sell": "賣出 (Sell)"}
+MAX_QTY = 10_000
+
+
+def place_order(uid, symbol, side, qty):
+    """排入委託佇列，下一個 tick 以該 tick 價格成交；資金與持股在成交時才檢查。"""
+    if symbol not in STOCKS_DATA: raise ValueError(f"未知代號：{symbol}")
+    if side not in SIDES: raise ValueError(f"未知方向：{side}")
+    qty = int(qty)
+    if not 0 < qty <= MAX_QTY: raise ValueError(f"股數需介於 1 ~ {MAX_QTY:,}")
+    return _insert_order(uid, symbol, side, qty)
+
+
+def settle(prices, now=None):
+    """撮合所有待成交委託 (由 market leader 在 tick 交易內呼叫)。
+
+    一次讀出佇列與相關使用者的餘額，依委託順序在記憶體中扣款/加股，
+    最後以 executemany 一次寫回；同一 tick 的委託全部用同一個價格成交。
+    回傳 (成交數, 拒絕數)。
+    """
+    now = time.time() if now is None else now
+    with transaction():
+        orders = get_pending_orders()
+        if not orders: return 0, 0
+        balances = get_balances({uid for _, uid, *_ in orders})
+        cash = {uid: money for uid, (money, _) in balances.items()}
+        held = {(uid, sym): q for uid, (_, stocks) in balances.items() for sym, q in stocks.items()}
+        fills, rejects = [], []
+        for oid, uid, symbol, side, qty in orders:
+            price = prices.get(symbol)
+            if uid not in cash or price is None:
+                rejects.append((oid, "無效的委託"))
+                continue
+            amount = int(round(qty * price))
+            if side == "buy":
+                if cash[uid] < amount:
+                    rejects.append((oid, "資金不足"))
+                    continue
+                cash[uid] -= amount
+                held[uid, symbol] = held.get((uid, symbol), 0) + qty
+            else:
+                if held.get((uid, symbol), 0) < qty:
+                    rejects.append((oid, "持股不足"))
+                    continue
+                cash[uid] += amount
+                held[uid, symbol] -= qty
+            fills.append((oid, price))
+        money_delta = {uid: cash[uid] - balances[uid][0] for uid in cash}
+        share_delta = {k: q - balances[k[0]][1].get(k[1], 0) for k, q in held.items() if k[0] in balances}
+        settle_orders(fills, rejects, money_delta, share_delta, now)
+    if fills: add_log(f"📈 [MARKET] 撮合 {len(fills)} 筆委託")
+    return len(fills), len(rejects)
+
+
+def portfolio_value(stocks, prices):
+    """單一玩家的持股市值：持股向量 · 價格向量。"""
+    if not stocks: return 0.0
+    qty = np.fromiter(stocks.values(), dtype=float, count=len(stocks))
+    px = np.fromiter((prices.get(s, 0.0) for s in stocks), dtype=float, count=len(stocks))
+    return float(qty @ px)
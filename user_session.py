@@ -0,0 +1,97 @@
+# user_session.py - 每次 rerun 的使用者工作單元 (Per-rerun Unit of Work)
+from collections.abc import Mapping
+
+from database import get_user, update_user_if
+
+RETRIES = 5
+
+
+class WriteConflict(RuntimeError):
+    """重試多次仍與其他寫入者衝突，或重新套用後餘額不足。"""
+
+
+class UserSession(Mapping):
+    """一次 rerun 只讀一次使用者資料；頁面的 add_exp / add_money 只改記憶體中的差量，
+    結束時 flush() 以一次 UPDATE ... WHERE version=? 寫回。spend_money 會立即寫回，確保先扣款才交付商品。
+
+    版本不符代表期間有其他寫入 (任務獎勵、交易撮合、其他分頁)：重新讀取最新資料並套用同樣的差量後重試，
+    不會用舊資料覆蓋別人的更新。可當 dict 讀取 (user['money'])，讀到的是已套用差量的值。
+    """
+
+    def __init__(self, uid, record):
+        self.uid = uid
+        self._base = record
+        self._delta = {"exp": 0, "money": 0}
+        self.dirty = set()
+
+    @classmethod
+    def load(cls, uid):
+        record = get_user(uid)
+        return None if record is None else cls(uid, record)
+
+    def _values(self, base):
+        exp = base["exp"] + self._delta["exp"]
+        money = base["money"] + self._delta["money"]
+        level = max(base["level"], 1 + exp // 100) if self._delta["exp"] else base["level"]
+        return {"level": level, "exp": exp, "money": money}
+
+    # --- Mapping ---
+    def __getitem__(self, key):
+        if key in self._delta or key == "level": return self._values(self._base)[key]
+        return self._base[key]
+
+    def __iter__(self):
+        return iter(self._base)
+
+    def __len__(self):
+        return len(self._base)
+
+    # --- 變更 (只改記憶體) ---
+    def add_exp(self, amount):
+        self._delta["exp"] += int(amount)
+        self.dirty.add("exp")
+
+    def add_money(self, amount):
+        self._delta["money"] += int(amount)
+        self.dirty.add("money")
+
+    def spend_money(self, amount):
+        """購買：扣款連同目前累積的差量立即寫回，成功後呼叫端才能交付商品。
+        餘額不足 (包含期間被其他寫入者扣掉) 時不扣款，回傳 False。"""
+        if self["money"] < amount: return False
+        self.add_money(-amount)
+        if self._commit(): return True
+        self._delta["money"] += int(amount)  # 只撤銷這筆扣款，其他差量留待 rerun 結束寫回
+        return False
+
+    # --- 寫回 ---
+    def _commit(self):
+        base = self._base
+        for _ in range(RETRIES):
+            values = self._values(base)
+            if values["money"] < 0: return False
+            if update_user_if(self.uid, base["version"], **values):
+                self._base = dict(base, version=base["version"] + 1, **values)
+                self._delta = {"exp": 0, "money": 0}
+                self.dirty.clear()
+                return True
+            base = get_user(self.uid)  # 其他寫入者搶先：以最新資料重新套用差量
+            if base is None: return False
+            self._base = base
+        return False
+
+    def flush(self):
+        """寫回累積的差量；沒有變更則不碰 DB。回傳是否有寫入。"""
+        if not self.dirty: return False
+        if self._commit(): return True
+        self._delta = {"exp": 0, "money": 0}
+        self.dirty.clear()
+        raise WriteConflict(f"使用者 {self.uid} 寫回失敗 (資料已被其他工作階段更新)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        return False
+
@@ -0,0 +1,31 @@
+# views - 各功能頁面 (Page modules)
+# 每頁一個模組，只有被選到時才 import，冷啟動不必載入所有頁面的相依套件
+import importlib
+
+import telemetry
+
+PAGES = {
+    "📊 儀表板 (Dashboard)": "dashboard",
+    "🧠 邏輯設計 (Logic Lab)": "logic_lab",
+    "⚔️ 演算法 (Algo Arena)": "arena",
+    "📡 訊號攔截 (Signals)": "signals",
+    "🏗️ 記憶體 (Memory)": "memory",
+    "🎛️ 自動控制 (PID)": "control",
+    "🌊 頻譜分析 (FFT)": "dsp",
+    "🧮 工程運算 (Math)": "calculator",
+}
+
+
+def load(nav):
+    return importlib.import_module(f"{__name__}.{PAGES[nav]}")
+
+
+def load_panel():
+    # 管理員側邊欄的效能面板
+    return importlib.import_module(f"{__name__}.telemetry_panel")
+
+
+def render(nav, uid, user):
+    module = load(nav)
+    with telemetry.timer(f"page.{PAGES[nav]}"):
+        module.render(uid, user)
@@ -0,0 +1,68 @@
+# views/arena.py - ⚔️ B: 演算法 (Algo Arena)
+import streamlit as st
+
+from arena_bench import WEAPONS
+from services import get_arena, get_missions
+from user_session import UserSession
+
+
+def render(uid, user):
+    st.title("⚔️ 演算法競技場 (Algo Arena)")
+    st.caption("課程：資料結構與複雜度 (Data Structures & Big O)")
+    
+    enemy_hp = st.session_state.get("enemy_hp", 100)
+    st.progress(enemy_hp / 100, text=f"BUG 怪獸血量 (HP): {enemy_hp}")
+
+    weapons = {"氣泡排序 (Bubble Sort) - O(n^2) 傷害低": "bubble", 
+               "Python 內建排序 (Timsort) - O(n log n) 傷害高": "timsort", 
+               "NumPy 極速排序 (Optimized) - 暴擊傷害": "numpy"}
+    weapon = st.selectbox("選擇演算法武器 (Algorithm)", list(weapons))
+
+    if st.session_state.pop("arena_win", False):
+        st.balloons()
+        st.success("Bug 修復完成 (Target Eliminated)！")
+
+    if st.button("編譯並執行 (Compile & Run)"):
+        get_missions().emit(uid, "attack_try")
+        fut = get_arena().submit(weapons[weapon])
+        if fut is None: st.warning("運算佇列已滿 (Queue Full)，請稍後再試。")
+        else: st.session_state.arena_job = fut
+    # 只有工作進行中才輪詢；沒有工作時結果是靜態內容，不會定時重跑
+    if "arena_job" in st.session_state: arena_poll(uid)
+    else: arena_result()
+
+@st.fragment(run_every=0.5)
+def arena_poll(uid):
+    # 只有這個區塊輪詢 benchmark 結果，頁面其他部分不會重跑；完成後整頁 rerun，輪詢隨之停止
+    fut = st.session_state.arena_job
+    if not fut.done():
+        st.info("CPU 運算中 (Processing)...")
+        return
+    del st.session_state["arena_job"]
+    try:
+        res = fut.result()
+    except Exception as e:
+        st.session_state.arena_last = {"error": str(e)}
+    else:
+        base_dmg = WEAPONS[res["weapon"]][1]
+        final_dmg = base_dmg * (2 if res["min"] < 0.001 else 1)
+        enemy_hp = max(0, st.session_state.get("enemy_hp", 100) - final_dmg)
+        st.session_state.enemy_hp = enemy_hp
+        st.session_state.arena_last = dict(res, dmg=final_dmg)
+        if enemy_hp == 0:
+            # fragment 不經過 main()，自己開一個工作單元寫回獎勵
+            with UserSession.load(uid) as user:
+                user.add_money(500)
+                user.add_exp(100)
+            st.session_state.enemy_hp = 100
+            st.session_state.arena_win = True
+    st.rerun()
+
+def arena_result():
+    last = st.session_state.get("arena_last")
+    if last is None: return
+    if "error" in last:
+        st.error(f"Runtime Error: {last['error']}")
+        return
+    st.code(f"Execution Time: min {last['min']:.6f} sec | median {last['median']:.6f} sec (x{last['repeat']})", language="bash")
+    st.success(f"命中！造成 {last['dmg']} 點傷害 (基於運算速度)")
@@ -0,0 +1,49 @@
+# views/calculator.py - 🧮 G: 工程運算核心 (Math)
+import numpy as np
+import streamlit as st
+
+from charts import figure, line, show, NEON
+from services import get_symbolic
+
+
+def render(uid, user):
+    st.title("🧮 工程運算核心 (Math Kernel)")
+    st.caption("課程：工程數學與微積分 (Calculus)")
+    
+    st.info("語法提示：`2*x`, `x**2` (平方), `sin(x)`")
+    
+    c1, c2 = st.columns([3, 1])
+    expr_str = c1.text_input("輸入函數 f(x):", value="sin(x) + 0.5*x")
+    x_range = c2.slider("X 軸範圍 (Range)", 5, 50, 10)
+    
+    svc = get_symbolic()
+    try:
+        res = svc.analyze(expr_str)
+        
+        c1, c2, c3 = st.columns(3)
+        c1.metric("f(x) 原式", f"${res['latex']['expr']}$")
+        c2.metric("f'(x) 微分", f"${res['latex']['deriv']}$")
+        if res['partial']: c3.metric("∫ f(x) 積分", "逾時 (Timeout)")
+        else: c3.metric("∫ f(x) 積分", f"${res['latex']['integ']}$")
+        if res['partial']: st.warning("積分運算逾時，僅顯示部分結果 (Partial result: integral timed out)。")
+        stats = svc.stats()
+        st.caption(f"快取 (Cache): hit {stats['hits']} / miss {stats['misses']} | 命中率 {stats['hit_rate']:.0%} | 逾時 {stats['timeouts']}")
+        
+        f_lambda = res['func']
+        # 範圍越寬取樣越密 (最多 20k 點)，送到瀏覽器前再由 LTTB 降採樣
+        x_vals = np.linspace(-x_range, x_range, min(20_000, 200 * x_range))
+        
+        try:
+            y_vals = f_lambda(x_vals)
+            if isinstance(y_vals, (int, float)): y_vals = np.full_like(x_vals, y_vals)
+            
+            fig = figure(line(x=x_vals, y=y_vals, line=dict(color=NEON, width=2)), title=f"函數繪圖 (Plot): y = {expr_str}")
+            show(fig, "calculator.plot")
+            
+            if st.button("上傳運算結果 (Upload Result)"):
+                st.success("運算數據已同步雲端。")
+                user.add_exp(20)
+        except Exception as e: st.warning(f"繪圖錯誤: {e}")
+            
+    except TimeoutError as e: st.error(f"運算逾時 (Timeout): {e}")
+    except Exception as e: st.error(f"語法錯誤 (Syntax Error): {e}")
@@ -0,0 +1,69 @@
+# views/control.py - 🎛️ E: 自動控制 (PID)
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+from charts import figure, line, show, NEON
+from pid_sweep import simulate, metrics, sweep, auto_tune, STEPS, KP_RANGE, KI_RANGE, KD_RANGE
+
+
+def render(uid, user):
+    st.title("🎛️ PID 控制實驗室 (Control Lab)")
+    st.caption("課程：回授控制系統 (Feedback Control Systems)")
+    
+    # 自動調參的結果要在 slider 建立前寫入，否則 Streamlit 不允許修改 widget 狀態
+    for k, v in st.session_state.pop("pid_tuned", {}).items(): st.session_state[k] = v
+    for k, v in {"pid_kp": 1.0, "pid_ki": 0.1, "pid_kd": 0.5}.items(): st.session_state.setdefault(k, v)
+
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        st.subheader("參數調校 (Tuning)")
+        kp = st.slider("Kp (比例)", *KP_RANGE, key="pid_kp")
+        ki = st.slider("Ki (積分)", *KI_RANGE, key="pid_ki")
+        kd = st.slider("Kd (微分)", *KD_RANGE, key="pid_kd")
+        target = st.slider("目標值 (Set Point)", 0, 100, 80)
+        run = st.button("啟動模擬 (Simulate)")
+        if st.button("自動調參 (Auto-Tune)"):
+            best = auto_tune(target)
+            if best is None: st.warning("找不到穩定的參數組合。")
+            else:
+                st.session_state.pid_tuned = {"pid_kp": round(best["kp"], 2), "pid_ki": round(best["ki"], 2), "pid_kd": round(best["kd"], 2)}
+                st.rerun()
+    
+    with c2:
+        if run:
+            history = simulate(kp, ki, kd, target)
+            m = metrics(history, target)
+            
+            fig = figure(line(y=[target]*STEPS, name="目標 (Target)", line=dict(dash="dash", color="#555")),
+                         line(y=history, name="響應 (Response)", line=dict(color=NEON)),
+                         title="步階響應圖 (Step Response)")
+            show(fig, "control.response")
+            
+            m1, m2, m3 = st.columns(3)
+            m1.metric("超越量 (Overshoot)", f"{m['overshoot']:.1f}%")
+            m2.metric("安定時間 (Settling)", "∞" if np.isinf(m['settling']) else f"{m['settling']:.0f} steps")
+            m3.metric("穩態誤差 (SSE)", f"{m['sse']:.2f}")
+            
+            if abs(history[-1] - target) < 2: 
+                st.success("系統穩定 (Stable)！獲得獎勵。")
+                user.add_exp(30)
+            else: st.warning("系統震盪 (Unstable)！請重新調整。")
+
+    st.divider()
+    st.subheader("參數空間掃描 (Gain Sweep)")
+    s1, s2 = st.columns([1, 3])
+    res = s1.select_slider("解析度 (Grid)", [25, 50, 100], value=100)
+    s1.caption(f"固定 Ki = {ki}，共 {res * res:,} 組 Kp × Kd")
+    if s1.button("執行掃描 (Sweep)"):
+        sw = sweep(ki, target, n=res)
+        settle = np.where(np.isfinite(sw["settling"]), sw["settling"], np.nan)
+        with s2:
+            h1, h2 = st.columns(2)
+            fig = figure(go.Heatmap(x=sw["kp"], y=sw["kd"], z=settle, colorscale="Viridis", colorbar=dict(title="steps")),
+                         title="安定時間 (Settling Time)", xaxis_title="Kp", yaxis_title="Kd", height=350)
+            show(fig, "control.settling", h1)
+            fig = figure(go.Heatmap(x=sw["kp"], y=sw["kd"], z=sw["stable"].astype(int), colorscale=[[0, "#330011"], [1, NEON]], showscale=False),
+                         title="穩定區域 (Stability Map)", xaxis_title="Kp", yaxis_title="Kd", height=350)
+            show(fig, "control.stability", h2)
+            st.caption(f"穩定比例 (Stable): {sw['stable'].mean():.0%}")
@@ -0,0 +1,80 @@
+# views/dashboard.py - 🖥️ 主控台與儀表板 (Dashboard)
+import streamlit as st
+
+from config import STOCKS_DATA, LEVEL_TITLES
+from database import recent_logs, get_orders, cancel_order
+from market import CHART_WINDOWS
+from charts import figure, line, show, NEON
+from leaderboard import BOARDS
+from services import get_market, get_missions, get_leaderboard
+from trading import SIDES, place_order, portfolio_value
+
+
+def update_stock_market():
+    snap = get_market().snapshot()
+    st.session_state.stock_prices = snap["prices"]
+
+def render(uid, user):
+    st.title(f"🖥️ 系統狀態: {user['name']}")
+    st.caption(f"ID: {uid} | 等級: {LEVEL_TITLES.get(min(user['level'], 5), 'Unknown')}")
+    update_stock_market()
+    
+    c1, c2 = st.columns([1, 3])
+    symbol = c1.selectbox("代號 (Symbol)", list(STOCKS_DATA), index=0)
+    window = c2.radio("區間 (Window)", list(CHART_WINDOWS), horizontal=True)
+    df = get_market().chart(symbol, CHART_WINDOWS[window])
+    if not df.empty:
+        fig = figure(line(x=df['time'], y=df['high'], line=dict(width=0), showlegend=False, hoverinfo='skip'),
+                     line(x=df['time'], y=df['low'], line=dict(width=0), fill='tonexty', fillcolor='rgba(0,255,65,0.15)', showlegend=False, hoverinfo='skip'),
+                     line(x=df['time'], y=df['close'], mode='lines+markers', line=dict(color=NEON), showlegend=False),
+                     title=f"{symbol} 指數 ({symbol} Index)", height=250)
+        show(fig, "dashboard.price")
+    
+    c1, c2, c3 = st.columns(3)
+    c1.metric("持有資金 (Credits)", f"${user['money']:,}")
+    c2.metric("股票資產 (Assets)", f"${portfolio_value(user.get('stocks', {}), st.session_state.stock_prices):,.0f}")
+    c3.metric("目前等級 (Level)", f"Lv.{user['level']}")
+    
+    st.subheader("💹 交易 (Trade)")
+    c1, c2, c3 = st.columns([2, 1, 1])
+    side = c1.radio("方向 (Side)", list(SIDES), format_func=SIDES.get, horizontal=True, key="trade_side")
+    qty = c2.number_input("股數 (Qty)", min_value=1, value=1, step=1, key="trade_qty")
+    price = st.session_state.stock_prices.get(symbol, 0.0)
+    c3.metric(f"{symbol} 現價", f"${price:,.2f}")
+    st.caption(f"預估金額 (Est.): ${qty * price:,.0f} — 委託於下一個 tick 以當時價格成交")
+    if st.button("送出委託 (Place Order)", key="trade_submit"):
+        try:
+            place_order(uid, symbol, side, qty)
+            st.success("委託已排入佇列 (Order queued)")
+        except ValueError as e: st.error(str(e))
+    orders = get_orders(uid, 5)
+    if orders:
+        st.dataframe([{"#": o["id"], "代號": o["symbol"], "方向": o["side"], "股數": o["qty"], "狀態": o["status"],
+                       "成交價": "" if o["price"] is None else f"${o['price']:,.2f}", "備註": o["note"] or ""}
+                      for o in orders], hide_index=True, use_container_width=True)
+        pending = [o["id"] for o in orders if o["status"] == "pending"]
+        if pending and st.button("取消待成交委託 (Cancel Pending)", key="trade_cancel"):
+            for oid in pending: cancel_order(uid, oid)
+            st.rerun()
+    
+    st.subheader("🏆 排行榜 (Leaderboard)")
+    board = get_leaderboard()
+    board.sync()  # 只讀取上次同步後變動的使用者
+    kind = st.radio("排名依據 (Rank by)", list(BOARDS), format_func=BOARDS.get, horizontal=True, key="lb_board")
+    rank = board.rank(kind, uid)
+    st.caption(f"我的名次 (My Rank): {'--' if rank is None else f'#{rank:,}'} / {len(board):,}")
+    rows = board.top(kind, 10)
+    st.dataframe([{"#": r["rank"], "玩家": r["name"], "等級": r["level"], "EXP": r["exp"], "身價": f"${r['worth']:,.0f}"}
+                  for r in rows], hide_index=True, use_container_width=True)
+    
+    st.subheader("🎯 任務進度 (Missions)")
+    for row in get_missions().progress(uid):
+        m = row["next"]
+        if m is None:
+            st.text(f"{row['event']}: 全部完成 ({row['total']}/{row['total']})")
+            continue
+        st.progress(min(1.0, row["count"] / m["goal"]),
+                    text=f"{m['id']} {m['name']} — {row['event']} {row['count']}/{m['goal']} (+${m['reward']})")
+
+    st.subheader("📡 系統日誌 (System Logs)")
+    for l in recent_logs(3): st.text(l)
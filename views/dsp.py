@@ -0,0 +1,63 @@
+# views/dsp.py - 🌊 F: 數位訊號處理 (FFT)
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+from charts import figure, line, show, NEON
+from dsp_engine import preview as dsp_preview, spectrum, spectrogram, StftStream, FS as DSP_FS, PREVIEW_MAX
+
+
+def render(uid, user):
+    st.title("🌊 頻譜分析儀 (FFT Analyzer)")
+    st.caption("課程：數位訊號處理 (DSP)")
+    
+    c1, c2 = st.columns(2)
+    f1 = c1.slider("頻率 1 (Freq 1 Hz)", 1, 50, 5); a1 = c1.slider("振幅 1 (Amp 1)", 1, 10, 5)
+    f2 = c2.slider("頻率 2 (Freq 2 Hz)", 1, 50, 20); a2 = c2.slider("振幅 2 (Amp 2)", 1, 10, 3)
+    
+    params = (f1, a1, f2, a2)
+    n = st.select_slider("取樣點數 (Samples)", [500, 10_000, 100_000, 1_000_000, 5_000_000], value=500,
+                         format_func=lambda v: f"{v:,} ({v / DSP_FS:,.0f} s)")
+    
+    # 長訊號的時域圖最多取前 PREVIEW_MAX 點，再由 LTTB 壓到螢幕寬度
+    t, y = dsp_preview(params, min(n, PREVIEW_MAX))
+    fig1 = figure(line(x=t, y=y, line=dict(color=NEON)), title="時域波形 (Time Domain)", height=200)
+    show(fig1, "dsp.time")
+    
+    if st.button("執行傅立葉轉換 (Compute FFT)"):
+        freqs, mag = spectrum(params, n)
+        mask = freqs > 0
+        if mask.sum() <= 512: spec = go.Bar(x=freqs[mask], y=mag[mask], marker_color='#ff0055')
+        else: spec = line(x=freqs[mask], y=mag[mask], line=dict(color='#ff0055'), fill='tozeroy')
+        fig2 = figure(spec, title="頻域分析 (Frequency Domain)", height=250)
+        show(fig2, "dsp.spectrum")
+        user.add_exp(50)
+
+    st.divider()
+    st.subheader("短時傅立葉 (STFT Spectrogram)")
+    s1, s2 = st.columns([1, 3])
+    live = s1.toggle("即時串流 (Live)", value=False)
+    fps = s1.slider("更新率 (FPS)", 1, 20, 5)
+    with s2:
+        if live: dsp_live(params, fps)
+        elif st.button("產生頻譜圖 (Spectrogram)"):
+            times, freqs, image = spectrogram(params, n)
+            render_spectrogram(times, freqs, image, "頻譜圖 (Spectrogram)", "dsp.spectrogram")
+
+def render_spectrogram(times, freqs, image, title, name):
+    fig = figure(go.Heatmap(x=times, y=freqs, z=image, colorscale="Viridis", zmin=-60, colorbar=dict(title="dB")),
+                 title=title, height=300, xaxis_title="t (s)", yaxis_title="Hz")
+    show(fig, name)
+
+def dsp_live(params, fps):
+    # 串流狀態放在 session；參數改變就重新開始
+    stream = st.session_state.get("dsp_stream")
+    if stream is None or stream.params != params:
+        stream = st.session_state.dsp_stream = StftStream(params, nfft=256, hop=64)
+
+    @st.fragment(run_every=1 / fps)
+    def frame():
+        stream.push(DSP_FS // fps)
+        times = (np.arange(stream.ring.shape[1]) - stream.ring.shape[1]) * stream.hop / DSP_FS + stream.sample / DSP_FS
+        render_spectrogram(times, stream.freqs, stream.image(), f"即時頻譜 (Live) | frames: {stream.frames}", "dsp.live")
+    frame()
@@ -0,0 +1,117 @@
+# views/logic_lab.py - 🧠 A: 邏輯設計 (Logic Lab)
+import time
+
+import numpy as np
+import streamlit as st
+
+from question_bank import get_bank
+from logic_sim import compile_circuit, random_gate_question, MAX_INPUTS, MAX_GATES
+from services import get_missions
+
+
+def render_logic_gate_svg(gate_type, val_a, val_b, output):
+    color = "#00ff41" if output else "#333"
+    return f"""
+    <svg width="200" height="100" viewBox="0 0 200 100">
+        <line x1="10" y1="30" x2="50" y2="30" stroke="{'#00ff41' if val_a else '#555'}" stroke-width="3"/>
+        <text x="0" y="35" fill="#00ff41" font-size="12">A={val_a}</text>
+        <line x1="10" y1="70" x2="50" y2="70" stroke="{'#00ff41' if val_b else '#555'}" stroke-width="3"/>
+        <text x="0" y="75" fill="#00ff41" font-size="12">B={val_b}</text>
+        <rect x="50" y="20" width="60" height="60" rx="10" fill="none" stroke="#00ff41" stroke-width="2"/>
+        <text x="65" y="55" fill="#00ff41" font-size="20">{gate_type}</text>
+        <line x1="110" y1="50" x2="180" y2="50" stroke="{color}" stroke-width="3"/>
+        <circle cx="180" cy="50" r="5" fill="{color}"/>
+        <text x="185" y="55" fill="{color}" font-size="14">{output}</text>
+    </svg>
+    """
+
+def render(uid, user):
+    st.title("🧠 邏輯設計 (Logic Design)")
+    st.caption("課程：布林代數與邏輯閘 (Boolean Algebra)")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("電路模擬 (Circuit Sim)")
+        gate_labels = {"AND (及閘)": "AND", "OR (或閘)": "OR", "XOR (互斥或)": "XOR",
+                       "NAND (反及)": "NAND", "NOR (反或)": "NOR", "XNOR (反互斥或)": "XNOR"}
+        gate_key = gate_labels[st.selectbox("選擇元件 (Component)", list(gate_labels))]
+        input_a = st.toggle("輸入 A (Input A)", value=True)
+        input_b = st.toggle("輸入 B (Input B)", value=False)
+        a_val = 1 if input_a else 0
+        b_val = 1 if input_b else 0
+        out = compile_circuit(f"A {gate_key} B").evaluate(A=a_val, B=b_val)["Y"]
+        
+        st.markdown(render_logic_gate_svg(gate_key, a_val, b_val, out), unsafe_allow_html=True)
+
+    with col2:
+        st.subheader("隨堂測驗 (Quiz)")
+        # 題目由編譯後的電路產生，答案不再手寫
+        if "logic_q" not in st.session_state: st.session_state.logic_q = random_gate_question()
+        q = st.session_state.logic_q
+        st.write(f"Q: {q['prompt']}")
+        ans = st.radio("你的答案 (Answer)", q['options'][:2], key=f"quiz_{q['id']}")
+        if st.button("提交 (Submit)"):
+            get_missions().emit(uid, "logic_use")
+            if ans == q['answer']:
+                st.success("Access Granted. 邏輯正確。")
+                user.add_exp(10)
+            else: st.error(f"Access Denied. 邏輯錯誤，正確答案：{q['answer']}")
+            st.session_state.logic_q = random_gate_question()
+
+    st.divider()
+    st.subheader("網表模擬 (Netlist Simulator)")
+    st.caption("每行 `訊號 = 運算式`，或單一運算式 (輸出為 Y)。支援 AND OR XOR NAND NOR XNOR NOT ( ) 以及 & | ^ ~，"
+               f"最多 {MAX_INPUTS} 個輸入、{MAX_GATES} 個閘。")
+    netlist = st.text_area("電路 (Netlist)", "S = A XOR B XOR CIN\nCOUT = (A AND B) OR (CIN AND (A XOR B))", height=110)
+    try:
+        t0 = time.perf_counter()
+        circuit = compile_circuit(netlist)
+        circuit.evaluate_all()
+        elapsed = time.perf_counter() - t0
+    except ValueError as e:
+        st.error(f"電路錯誤：{e}")
+    else:
+        m1, m2, m3 = st.columns(3)
+        m1.metric("輸入 (Inputs)", len(circuit.inputs))
+        m2.metric("真值表列數 (Rows)", f"{circuit.rows:,}")
+        m3.metric("模擬時間 (Eval)", f"{elapsed * 1000:.2f} ms")
+        if len(circuit.inputs) <= 6:
+            rows = np.arange(circuit.rows)
+            table = {name: (rows >> (len(circuit.inputs) - 1 - k)) & 1 for k, name in enumerate(circuit.inputs)}
+            table.update({name: circuit.column(name) for name in circuit.outputs})
+            st.dataframe(table, hide_index=True, use_container_width=True)
+        else:
+            ones = circuit.ones()
+            st.dataframe({"輸出 (Output)": list(ones), "1 的列數": list(ones.values()),
+                          "比例": [f"{v / circuit.rows:.2%}" for v in ones.values()]}, hide_index=True)
+
+    st.divider()
+    st.subheader("題庫挑戰 (Question Bank)")
+    bank = get_bank()
+    c1, c2 = st.columns(2)
+    category = c1.selectbox("題庫分類 (Category)", ["ALL"] + bank.categories)
+    level = c2.selectbox("難度 (Difficulty)", ["ALL"] + bank.levels)
+    category = None if category == "ALL" else category
+    level = None if level == "ALL" else level
+
+    if st.session_state.get("bank_filter") != (category, level) or "bank_q" not in st.session_state:
+        st.session_state.bank_filter = (category, level)
+        st.session_state.bank_q = bank.draw(uid, category, level)
+    idx = st.session_state.bank_q
+    if idx is None or idx >= len(bank):
+        st.session_state.pop("bank_q", None)
+        st.info("此分類沒有題目 (No questions)。")
+        return
+
+    q = bank.question(idx)
+    acc = bank.accuracy(idx)
+    st.write(f"[{q['id']}] {q['prompt']}")
+    st.caption(f"難度 {q['difficulty']} | 答對率 (Accuracy): " + ("--" if acc is None else f"{acc:.0%}"))
+    pick = st.radio("選項 (Options)", q['options'], key=f"bank_ans_{idx}")
+    if st.button("作答 (Answer)"):
+        get_missions().emit(uid, "quiz_done")
+        if bank.check(idx, pick):
+            st.success("Access Granted. 答對了！")
+            user.add_exp(10 * q['difficulty'])
+        else: st.error(f"Access Denied. 正確答案：{q['answer']}")
+        st.session_state.bank_q = bank.draw(uid, category, level)
@@ -0,0 +1,37 @@
+# views/memory.py - 🏗️ D: 記憶體管理 (Memory Stack)
+import streamlit as st
+
+from memory_stack import BLOCK_TYPES
+from services import get_memory, get_missions
+
+
+def render(uid, user):
+    st.title("🏗️ 記憶體堆疊 (Memory Stack)")
+    st.caption("課程：陣列與鏈結串列 (Array vs Linked List)")
+    
+    stack = get_memory().get(uid)
+    income = stack.total_yield
+    st.metric("記憶體收益 (Memory Yield)", f"${income}/cycle")
+    st.caption(" | ".join(f"{kind}: {n:,}" for kind, n in stack.counts.items()) + f" | 總區塊 (Blocks): {len(stack):,}")
+    
+    cols = st.columns(len(BLOCK_TYPES))
+    for col, (kind, (price, _)) in zip(cols, BLOCK_TYPES.items()):
+        label = {"Arr": "陣列 Array", "Node": "節點 Node"}.get(kind, kind)
+        if col.button(f"配置{label} (${price})"):
+            # spend_money 已寫回 DB 才配置區塊與計任務，寫回失敗不會送出免費區塊
+            if user.spend_money(price): 
+                get_missions().emit(uid, "shop_buy")
+                get_memory().allocate(uid, kind)
+                st.rerun()
+            else: st.error("餘額不足 (Insufficient Credits)")
+            
+    st.write("--- Heap 視覺化 (Visualization) ---")
+    cols = st.columns(10)
+    for i, kind in enumerate(stack.tail(20)):
+        color = "🟩" if kind == "Arr" else "🟧"
+        cols[i%10].write(f"{color}")
+
+    if st.button("執行垃圾回收 (Garbage Collection)"):
+        user.add_money(income)
+        get_missions().emit(uid, "bank_save")
+        st.success(f"記憶體釋放完成。獲得收益：${income}")
@@ -0,0 +1,61 @@
+# views/signals.py - 📡 C: 訊號處理 (Signals)
+import random
+import time
+
+import numpy as np
+import streamlit as st
+
+from charts import figure, line, show, NEON
+from scope_stream import ENCODINGS, SCOPE_FPS
+from services import get_scope
+
+
+def render(uid, user):
+    st.title("📡 訊號攔截 (Signal Interception)")
+    st.caption("課程：數位編碼 (Hex/Binary Encoding)")
+    
+    if "signal_target" not in st.session_state:
+        target = random.choice(["FPGA", "CMOS", "UART", "KERNEL", "BIOS"])
+        st.session_state.signal_target = target
+        st.session_state.signal_hex = target.encode().hex().upper()
+
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        st.subheader("示波器畫面 (Oscilloscope)")
+        s1, s2, s3 = st.columns([2, 1, 1])
+        encoding = s1.radio("編碼 (Encoding)", list(ENCODINGS), format_func=ENCODINGS.get, horizontal=True, key="scope_enc")
+        live = s2.toggle("即時串流 (Live)", value=True, key="scope_live")
+        fps = s3.slider("更新率 (FPS)", 1, 30, SCOPE_FPS, key="scope_fps")
+        stream = get_scope(st.session_state.signal_hex, encoding)
+        if live: scope_live(stream, fps)
+        else:
+            stream.advance()
+            scope_plot(stream)
+        st.code(f"接收訊號 (Hex): 0x{st.session_state.signal_hex}")
+    with c2:
+        ans = st.text_input("解碼為 ASCII (全大寫):")
+        if st.button("傳送 (Transmit)"):
+            if ans == st.session_state.signal_target:
+                st.success("解碼成功 (Decoded Successfully)！")
+                user.add_money(300)
+                user.add_exp(50)
+                del st.session_state['signal_target']
+                time.sleep(1)
+                st.rerun()
+            else: st.error("驗證失敗 (CRC Error)。")
+
+def scope_plot(stream):
+    samples, latest = stream.window()
+    # x 軸以位元為單位，最右邊是最新的樣本
+    x = (np.arange(len(samples)) - len(samples) + latest) / stream.samples_per_bit
+    fig = figure(line(x=x, y=samples, line=dict(color=NEON, width=1)), height=200, margin=dict(l=0, r=0, t=10, b=0),
+                 xaxis_visible=False, yaxis=dict(visible=False, range=[-0.6, 1.6]))
+    show(fig, "signals.scope")
+
+def scope_live(stream, fps):
+    # 只有示波器區塊依 FPS 局部重跑；樣本由共用的 stream 依時間產生
+    @st.fragment(run_every=1 / fps)
+    def frame():
+        stream.advance()
+        scope_plot(stream)
+    frame()
@@ -0,0 +1,31 @@
+# views/telemetry_panel.py - 📈 效能監控面板 (Admin Telemetry Panel)
+import time
+
+import streamlit as st
+
+import telemetry
+
+
+def _fmt(value, unit):
+    return f"{value / 1024:,.1f} KB" if unit == "bytes" else f"{value * 1000:,.2f} ms"
+
+
+def render():
+    snap = telemetry.snapshot()
+    with st.sidebar.expander("📈 效能監控 (Telemetry)"):
+        rerun = snap.get("rerun")
+        if rerun: st.caption(f"Rerun p50 {_fmt(rerun['p50'], 'seconds')} | p95 {_fmt(rerun['p95'], 'seconds')} | 共 {rerun['count']:,} 次")
+        prefix = st.selectbox("類別 (Group)", ["page", "db", "chart", "rerun"], key="telemetry_group")
+        rows = [{"name": name.split(".", 1)[-1], "n": s["count"],
+                 **{f"p{p}": _fmt(s[f"p{p}"], s["unit"]) for p in telemetry.PERCENTILES}, "max": _fmt(s["max"], s["unit"])}
+                for name, s in snap.items() if name.split(".", 1)[0] == prefix]
+        if rows: st.dataframe(rows, hide_index=True, use_container_width=True)
+        else: st.caption("尚無資料 (No samples)。")
+
+        c1, c2 = st.columns(2)
+        c1.download_button("Prometheus", telemetry.to_prometheus(snap), "cityos_metrics.prom", "text/plain")
+        c2.download_button("JSON", telemetry.to_json(snap), "cityos_metrics.json", "application/json")
+        if telemetry.PROFILE_RATE > 0:
+            st.caption(f"cProfile 抽樣 {telemetry.PROFILE_RATE:.0%}，超過 {telemetry.PROFILE_SLOW_MS:.0f} ms 存檔：")
+            for ts, label, ms, path in reversed(telemetry.captures):
+                st.text(f"{time.strftime('%H:%M:%S', time.localtime(ts))} {label} {ms:.0f} ms\n{path}")